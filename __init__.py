@@ -5,6 +5,7 @@ from .cache_engine import (
     save_method,
     load_method,
     metadata_setter,
+    identity_key,
 )
 
 from .compute_function import (
@@ -14,27 +15,46 @@ from .compute_function import (
     Void,
 )
 
-from .interface import CacheInterface
-
 from .computation_object_metadata import ComputationObjectMetadata
-from .computation_object_refs import CoVars
+from .computation_object_refs import CoVars, ComputationObjectHandle
 from .db_manager import DBManager
+from .object_layout import ObjectLayout
+from .timings import Timings
 from . import sqltypes
+from . import payload_codecs
 
+# CacheInterface is left out, so that `from ccache import *` does not import the CLI
 __all__ = [
-    "CacheInterface",
     "CacheEngine",
     "computation_object",
     "computation_function",
     "save_method",
     "load_method",
     "metadata_setter",
+    "identity_key",
     "In",
     "Out",
     "Void",
     "ComputationFunction",
     "ComputationObjectMetadata",
     "CoVars",
+    "ComputationObjectHandle",
     "DBManager",
+    "ObjectLayout",
+    "Timings",
     "sqltypes",
+    "payload_codecs",
 ]
+
+
+def __getattr__(name: str):
+    # the CLI is imported on first use, since it imports curses and readline and
+    # registers its commands, which processes that only use the engine do not need
+    if name == "CacheInterface":
+        from .interface import CacheInterface
+        return CacheInterface
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | {"CacheInterface"})
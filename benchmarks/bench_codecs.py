@@ -0,0 +1,139 @@
+"""Benchmarks the payload codecs on computation objects.
+
+Reports the compression ratio and the compression and decompression
+throughput of every codec, per computation object type.
+
+Usage:
+    python benchmarks/bench_codecs.py
+        benchmarks a synthetic numeric dump type.
+    python benchmarks/bench_codecs.py -module mytypes -query "SELECT * FROM :MyArray LIMIT 100"
+        benchmarks stored objects of your own types. `mytypes` is imported to
+        register the types, and the store in the working directory is used.
+"""
+import argparse
+import array
+import importlib
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+from ccache import CacheEngine, DBManager, ComputationObjectMetadata, computation_object, save_method, load_method
+from ccache import payload_codecs as codecs
+
+
+def get_raw_payload(obj, tmp_dir: str) -> bytes:
+    """Returns the uncompressed bytes the save method of `obj` writes."""
+    obj_data = CacheEngine._get_computation_object_data(type(obj))
+    save_func = CacheEngine._get_save_func(obj, obj_data)
+    if obj_data.save_buffer:
+        return bytes(CacheEngine._get_payload_buffer(save_func))
+
+    path = os.path.join(tmp_dir, "raw")
+    save_func(path)
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def benchmark_codecs(objs: list, codec_names: tuple[str, ...] = codecs.CODECS) -> list[dict]:
+    """
+    Compresses and decompresses the payloads of `objs` with every codec and
+    returns one result dict per computation object type and codec.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        payloads: dict[str, list[bytes]] = {}
+        for obj in objs:
+            identifier = CacheEngine._get_computation_object_data(type(obj)).object_identifier
+            payloads.setdefault(identifier, []).append(get_raw_payload(obj, tmp_dir))
+
+        path = os.path.join(tmp_dir, "payload")
+        for identifier, raws in payloads.items():
+            raw_bytes = sum(len(raw) for raw in raws)
+            for codec in codec_names:
+                stored_bytes = 0
+                compress_time = 0.0
+                decompress_time = 0.0
+                for raw in raws:
+                    start = time.perf_counter()
+                    with open(path, "wb") as file:
+                        with codecs.wrap_writer(file, codec) as dst:
+                            for i in range(0, len(raw), codecs.COPY_CHUNK_SIZE):
+                                dst.write(raw[i:i + codecs.COPY_CHUNK_SIZE])
+                    compress_time += time.perf_counter() - start
+                    stored_bytes += os.path.getsize(path)
+
+                    start = time.perf_counter()
+                    with open(path, "rb") as file:
+                        with codecs.wrap_reader(file, codec) as src:
+                            while src.read(codecs.COPY_CHUNK_SIZE):
+                                pass
+                    decompress_time += time.perf_counter() - start
+
+                results.append({
+                    "type": identifier,
+                    "codec": codec,
+                    "objects": len(raws),
+                    "raw_bytes": raw_bytes,
+                    "stored_bytes": stored_bytes,
+                    "ratio": raw_bytes / stored_bytes if stored_bytes else math.inf,
+                    "compress_mb_s": raw_bytes / 1e6 / compress_time if compress_time else math.inf,
+                    "decompress_mb_s": raw_bytes / 1e6 / decompress_time if decompress_time else math.inf,
+                })
+    return results
+
+
+def format_results(results: list[dict]) -> str:
+    lines = [f"{'type':<20} {'codec':<6} {'raw MB':>9} {'stored MB':>10} {'ratio':>7} {'comp MB/s':>10} {'decomp MB/s':>12}"]
+    for r in results:
+        lines.append(
+            f"{r['type']:<20} {r['codec']:<6} {r['raw_bytes'] / 1e6:>9.2f} {r['stored_bytes'] / 1e6:>10.2f} "
+            f"{r['ratio']:>7.2f} {r['compress_mb_s']:>10.1f} {r['decompress_mb_s']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+@computation_object("BenchNumericDump", metadata=ComputationObjectMetadata())
+class NumericDump:
+    """A synthetic numeric dump: a noisy signal of rounded float64 samples."""
+
+    def __init__(self, seed: int, n: int):
+        rng = random.Random(seed)
+        self.values = array.array("d", (round(math.sin(i / 100) + rng.gauss(0, 0.01), 3) for i in range(n)))
+
+    @save_method(buffer=True)
+    def save(self):
+        return self.values
+
+    @load_method(buffer=True)
+    def load(self, buf):
+        self.values = buf.cast("d")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-module", help="module to import to register the computation object types")
+    parser.add_argument("-query", help="query selecting the stored objects to benchmark")
+    parser.add_argument("-objects", type=int, default=20, help="number of synthetic objects")
+    parser.add_argument("-samples", type=int, default=500_000, help="number of samples per synthetic object")
+    parser.add_argument("-json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    if args.query:
+        if args.module:
+            importlib.import_module(args.module)
+        CacheEngine.initialize()
+        CacheEngine.start()
+        ucs = DBManager.get_uids_and_co_ids(args.query)
+        objs = [CacheEngine.load_object(co_id, uid, use_cache=False) for uid, co_id in ucs]
+    else:
+        objs = [NumericDump(seed, args.samples) for seed in range(args.objects)]
+
+    results = benchmark_codecs(objs)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Stress-tests one store used by several processes at the same time.
+
+Every process saves objects with `save_object` and queries the store with
+`get_uids_and_co_ids` in between. The benchmark reports the throughput, the
+save latency and the operations that failed, e.g. with "database is locked",
+and checks that all processes wrote to a single relation.
+
+Usage:
+    python benchmarks/bench_concurrency.py -processes 8 -saves 500
+        runs against a new store in WAL mode (`initialize(concurrent=True)`).
+    python benchmarks/bench_concurrency.py -mode default
+        runs against a new store with the default rollback journal, for comparison.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3 as sql
+import sys
+import tempfile
+import time
+
+from ccache import CacheEngine, DBManager, ComputationObjectMetadata, computation_object, save_method, load_method, metadata_setter
+from ccache import sqltypes as sqlt
+
+START_DELAY = 1.0
+"""Seconds between starting the processes and starting the work, so that all processes start together."""
+
+
+@computation_object("BenchCounter", metadata=ComputationObjectMetadata(worker=sqlt.INT, idx=sqlt.INT))
+class Counter:
+    def __init__(self, worker: int = 0, idx: int = 0):
+        self.worker = worker
+        self.idx = idx
+
+    def __hash__(self):
+        return hash((self.worker, self.idx))
+
+    @save_method
+    def save(self, path):
+        with open(path, "w") as file:
+            file.write(f"{self.worker} {self.idx}")
+
+    @load_method
+    def load(self, path):
+        with open(path, "r") as file:
+            self.worker, self.idx = map(int, file.read().split())
+
+    @metadata_setter(("worker", "idx"))
+    def set_metadata(self):
+        return (self.worker, self.idx)
+
+
+def run_worker(worker: int, store_dir: str, concurrent: bool, n_saves: int, reads_per_save: int, start_at: float) -> dict:
+    # the engine reports failed saves and resolved relations on stdout
+    sys.stdout = open(os.devnull, "w")
+    os.chdir(store_dir)
+
+    result = {"saves": 0, "failed_saves": 0, "reads": 0, "failed_reads": 0, "save_latencies": [], "error": None}
+    try:
+        CacheEngine.initialize(concurrent=concurrent)
+        CacheEngine.start()
+    except sql.OperationalError as e:
+        result["error"] = str(e)
+        return result
+
+    time.sleep(max(0.0, start_at - time.time()))
+    query = f"SELECT uid FROM :BenchCounter WHERE worker = {worker}"
+    for idx in range(n_saves):
+        start = time.perf_counter()
+        try:
+            uid = CacheEngine.save_object(Counter(worker, idx))
+        except sql.OperationalError:
+            uid = None
+        result["save_latencies"].append(time.perf_counter() - start)
+        if uid is None:
+            result["failed_saves"] += 1
+        else:
+            result["saves"] += 1
+
+        for _ in range(reads_per_save):
+            try:
+                DBManager.get_uids_and_co_ids(query)
+                result["reads"] += 1
+            except sql.OperationalError:
+                result["failed_reads"] += 1
+
+    return result
+
+
+def run_benchmark(n_processes: int, n_saves: int, reads_per_save: int, concurrent: bool) -> dict:
+    with tempfile.TemporaryDirectory() as store_dir:
+        ctx = multiprocessing.get_context("spawn")
+        start_at = time.time() + START_DELAY
+        with ctx.Pool(n_processes) as pool:
+            results = pool.starmap(
+                run_worker,
+                [(worker, store_dir, concurrent, n_saves, reads_per_save, start_at) for worker in range(n_processes)]
+                )
+        elapsed = time.time() - start_at
+
+        conn = sql.connect(os.path.join(store_dir, CacheEngine._db_dir))
+        stored = conn.execute("SELECT COUNT(*) FROM computation_objects").fetchone()[0]
+        n_relations = conn.execute("SELECT COUNT(*) FROM relations WHERE co_identifier = 'BenchCounter'").fetchone()[0]
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+    latencies = sorted(lat for r in results for lat in r["save_latencies"])
+    saves = sum(r["saves"] for r in results)
+    reads = sum(r["reads"] for r in results)
+    return {
+        "journal_mode": journal_mode,
+        "processes": n_processes,
+        "seconds": elapsed,
+        "saves": saves,
+        "failed_saves": sum(r["failed_saves"] for r in results),
+        "reads": reads,
+        "failed_reads": sum(r["failed_reads"] for r in results),
+        "failed_initializations": sum(r["error"] is not None for r in results),
+        "saves_per_s": saves / elapsed,
+        "reads_per_s": reads / elapsed,
+        "save_p50_ms": latencies[len(latencies) // 2] * 1e3 if latencies else 0.0,
+        "save_p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3 if latencies else 0.0,
+        "stored_objects": stored,
+        "relations": n_relations,
+    }
+
+
+def format_result(result: dict) -> str:
+    return "\n".join(f"{key:<24} {value:.2f}" if isinstance(value, float) else f"{key:<24} {value}" for key, value in result.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-processes", type=int, default=4, help="number of processes using the store")
+    parser.add_argument("-saves", type=int, default=200, help="number of objects each process saves")
+    parser.add_argument("-reads", type=int, default=1, help="number of queries after each save")
+    parser.add_argument("-mode", choices=("concurrent", "default"), default="concurrent", help="how the processes open the store")
+    parser.add_argument("-json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.processes, args.saves, args.reads, args.mode == "concurrent")
+    print(json.dumps(result, indent=2) if args.json else format_result(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Benchmarks the hot paths of the engine on stores of growing size.
+
+For every store size, a new store is filled with synthetic objects in a new
+process, and the benchmark times:
+
+    save_bulk        `save_objects` of all objects
+    save_single      `save_object` of more objects, one at a time
+    load_single      `load_object` of random objects, bypassing the object cache
+    load_bulk        `load_objects` of random objects on a thread pool
+    query_indexed    `get_uids_and_co_ids` of 100 objects by an indexed variable
+    query_scan       `get_uids_and_co_ids` of a tenth of the objects by a scan
+    resolve_query    `DBManager._resolve_query` of a query naming two types
+    exec_miss        `perform_computation_function`, calling and saving
+    exec_hit         `perform_computation_function` with a memoized result
+    reconcile        resolving the relation after the metadata changed
+    migrate          copying the rows into the new relation
+
+Results are rates in operations per second. Written with `-out`, they can be
+compared with a later run with `-baseline`, which reports the cases that got
+slower than the tolerance and exits with status 1 if there are any. Single
+saves are bound by fsync and vary between runs, so run several times with
+`-repeat` to compare the fastest runs.
+
+Usage:
+    python benchmarks/bench_engine.py -sizes 1000 10000 100000 -repeat 3 -out baseline.json
+        benchmarks stores of 1e3, 1e4 and 1e5 objects and stores the results.
+    python benchmarks/bench_engine.py -sizes 1000 10000 100000 -repeat 3 -baseline baseline.json
+        benchmarks the same stores and compares the results with the baseline.
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3 as sql
+import sys
+import tempfile
+import time
+
+from ccache import (
+    CacheEngine, DBManager, ComputationObjectMetadata, In, Out,
+    computation_object, computation_function, save_method, load_method, metadata_setter,
+)
+from ccache import sqltypes as sqlt
+
+DEFAULT_SIZES = (1000, 10_000)
+DEFAULT_SAMPLE = 1000
+"""The number of timed operations of the cases that do not cover the whole store."""
+RESOLVE_REPEATS = 10_000
+DEFAULT_TOLERANCE = 0.2
+"""The fraction a rate may drop below the baseline before it counts as a regression."""
+N_LABELS = 10
+
+
+@computation_object(
+    "BenchPoint",
+    metadata=ComputationObjectMetadata(x=sqlt.INT, y=sqlt.REAL, label=sqlt.TEXT).add_index("x"),
+    )
+class Point:
+    def __init__(self, x: int = 0):
+        self.x = x
+
+    def __hash__(self):
+        return hash(self.x)
+
+    @save_method(buffer=True)
+    def save(self):
+        return self.x.to_bytes(8, "little", signed=True)
+
+    @load_method(buffer=True)
+    def load(self, buf):
+        self.x = int.from_bytes(buf, "little", signed=True)
+
+    @metadata_setter(("x", "y", "label"))
+    def set_metadata(self):
+        return (self.x, self.x / 7, f"l{self.x % N_LABELS}")
+
+
+@computation_function(In(Point), Out(Point))
+def bench_shift(p: Point, dx: int):
+    return Point(p.x + dx)
+
+
+def time_ops(n_ops: int, op) -> tuple[float, list[float]]:
+    """Calls `op(i)` for every `i` below `n_ops` and returns the total time and the latency of each call."""
+    latencies = []
+    for i in range(n_ops):
+        start = time.perf_counter()
+        op(i)
+        latencies.append(time.perf_counter() - start)
+    return sum(latencies), latencies
+
+
+def make_result(case: str, n_objects: int, n_ops: int, seconds: float, latencies: list[float] | None = None) -> dict:
+    result = {
+        "case": case,
+        "objects": n_objects,
+        "ops": n_ops,
+        "seconds": seconds,
+        "ops_per_s": n_ops / seconds if seconds else float("inf"),
+        "p50_ms": None,
+        "p99_ms": None,
+    }
+    if latencies:
+        latencies = sorted(latencies)
+        result["p50_ms"] = latencies[len(latencies) // 2] * 1e3
+        result["p99_ms"] = latencies[int(len(latencies) * 0.99)] * 1e3
+    return result
+
+
+def run_size(n_objects: int, n_sample: int, store_dir: str) -> list[dict]:
+    """Fills a new store in `store_dir` with `n_objects` objects and runs every case on it."""
+    # `_resolve_query` prints the relations it resolves
+    sys.stdout = open(os.devnull, "w")
+    os.chdir(store_dir)
+    CacheEngine.initialize()
+    CacheEngine.start()
+    rng = random.Random(n_objects)
+    n_sample = min(n_sample, n_objects)
+    results = []
+
+    start = time.perf_counter()
+    uids = CacheEngine.save_objects(Point(x) for x in range(n_objects))
+    results.append(make_result("save_bulk", n_objects, n_objects, time.perf_counter() - start))
+
+    seconds, latencies = time_ops(n_sample, lambda i: CacheEngine.save_object(Point(n_objects + i)))
+    results.append(make_result("save_single", n_objects, n_sample, seconds, latencies))
+
+    sample = rng.sample(uids, n_sample)
+    seconds, latencies = time_ops(n_sample, lambda i: CacheEngine.load_object(Point, sample[i], use_cache=False))
+    results.append(make_result("load_single", n_objects, n_sample, seconds, latencies))
+
+    CacheEngine._object_cache.clear()
+    start = time.perf_counter()
+    CacheEngine.load_objects([(Point, uid) for uid in sample])
+    results.append(make_result("load_bulk", n_objects, n_sample, time.perf_counter() - start))
+
+    n_queries = max(1, n_sample // 10)
+    lows = [rng.randrange(max(1, n_objects - 100)) for _ in range(n_queries)]
+    seconds, latencies = time_ops(n_queries, lambda i: DBManager.get_uids_and_co_ids(
+        f"SELECT uid FROM :BenchPoint WHERE x >= {lows[i]} AND x < {lows[i] + 100}"
+        ))
+    results.append(make_result("query_indexed", n_objects, n_queries, seconds, latencies))
+
+    n_scans = max(1, n_queries // 10)
+    seconds, latencies = time_ops(n_scans, lambda i: DBManager.get_uids_and_co_ids(
+        f"SELECT uid FROM :BenchPoint WHERE label = 'l{i % N_LABELS}'"
+        ))
+    results.append(make_result("query_scan", n_objects, n_scans, seconds, latencies))
+
+    query = "SELECT p.uid FROM :BenchPoint AS p JOIN :BenchPoint AS q ON p.x = q.x + 1"
+    start = time.perf_counter()
+    for _ in range(RESOLVE_REPEATS):
+        DBManager._resolve_query(query)
+    results.append(make_result("resolve_query", n_objects, RESOLVE_REPEATS, time.perf_counter() - start))
+
+    # shift beyond the saved objects, so that every result is new
+    inputs = CacheEngine.load_objects([(Point, uid) for uid in sample])
+    seconds, latencies = time_ops(n_sample, lambda i: CacheEngine.perform_computation_function(
+        "bench_shift", [inputs[i]], [2 * n_objects], recompute=True
+        ))
+    results.append(make_result("exec_miss", n_objects, n_sample, seconds, latencies))
+
+    CacheEngine._object_cache.clear()
+    seconds, latencies = time_ops(n_sample, lambda i: CacheEngine.perform_computation_function(
+        "bench_shift", [inputs[i]], [2 * n_objects]
+        ))
+    results.append(make_result("exec_hit", n_objects, n_sample, seconds, latencies))
+
+    # change the metadata of the type last, since the registered type keeps the old metadata
+    obj_data = CacheEngine._get_computation_object_data(Point)
+    changed_data = dataclasses.replace(
+        obj_data,
+        metadata=ComputationObjectMetadata(x=sqlt.INT, y=sqlt.REAL, label=sqlt.TEXT, z=sqlt.INT).add_index("x"),
+        )
+    DBManager._metadata_hash_cache.pop(obj_data.object_identifier, None)
+    start = time.perf_counter()
+    DBManager._get_co_relation(changed_data)
+    results.append(make_result("reconcile", n_objects, 1, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    n_rows = DBManager.migrate_relations()
+    results.append(make_result("migrate", n_objects, n_rows, time.perf_counter() - start))
+
+    DBManager.close()
+    return results
+
+
+def run_benchmark(sizes: list[int], n_sample: int, n_repeats: int = 1) -> dict:
+    """Runs every size `n_repeats` times and keeps the fastest result of each case, which is the least disturbed by other load."""
+    # every run gets a new process, so that no state carries over between stores
+    ctx = multiprocessing.get_context("spawn")
+    best: dict[tuple[str, int], dict] = {}
+    for n_objects in sizes:
+        for _ in range(n_repeats):
+            with tempfile.TemporaryDirectory() as store_dir, ctx.Pool(1) as pool:
+                for result in pool.apply(run_size, (n_objects, n_sample, store_dir)):
+                    key = (result["case"], n_objects)
+                    if key not in best or result["ops_per_s"] > best[key]["ops_per_s"]:
+                        best[key] = result
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sql.sqlite_version,
+            "platform": platform.platform(),
+            "sample": n_sample,
+            "repeats": n_repeats,
+        },
+        "results": list(best.values()),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """
+    Returns a dict per case and store size that is in both `results` and `baseline`,
+    with the rates and their ratio, and whether the rate dropped below the tolerance.
+    """
+    baseline_rates = {(r["case"], r["objects"]): r["ops_per_s"] for r in baseline["results"]}
+    comparison = []
+    for r in results["results"]:
+        baseline_rate = baseline_rates.get((r["case"], r["objects"]))
+        if baseline_rate is None:
+            continue
+        ratio = r["ops_per_s"] / baseline_rate
+        comparison.append({
+            "case": r["case"],
+            "objects": r["objects"],
+            "baseline_ops_per_s": baseline_rate,
+            "ops_per_s": r["ops_per_s"],
+            "ratio": ratio,
+            "regression": ratio < 1 - tolerance,
+        })
+    return comparison
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'case':<16} {'objects':>9} {'ops':>9} {'seconds':>9} {'ops/s':>12} {'p50 ms':>9} {'p99 ms':>9}"]
+    for r in results["results"]:
+        p50 = f"{r['p50_ms']:>9.3f}" if r["p50_ms"] is not None else f"{'-':>9}"
+        p99 = f"{r['p99_ms']:>9.3f}" if r["p99_ms"] is not None else f"{'-':>9}"
+        lines.append(f"{r['case']:<16} {r['objects']:>9} {r['ops']:>9} {r['seconds']:>9.3f} {r['ops_per_s']:>12.1f} {p50} {p99}")
+    return "\n".join(lines)
+
+
+def format_comparison(comparison: list[dict]) -> str:
+    lines = [f"{'case':<16} {'objects':>9} {'baseline/s':>12} {'ops/s':>12} {'ratio':>7}"]
+    for c in comparison:
+        flag = "  REGRESSION" if c["regression"] else ""
+        lines.append(
+            f"{c['case']:<16} {c['objects']:>9} {c['baseline_ops_per_s']:>12.1f} {c['ops_per_s']:>12.1f} {c['ratio']:>7.2f}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="numbers of objects in the stores")
+    parser.add_argument("-sample", type=int, default=DEFAULT_SAMPLE, help="number of timed operations per case")
+    parser.add_argument("-repeat", type=int, default=1, help="number of runs per size, keeping the fastest result of each case")
+    parser.add_argument("-out", help="file to write the results to as JSON")
+    parser.add_argument("-baseline", help="results of an earlier run to compare with")
+    parser.add_argument("-tolerance", type=float, default=DEFAULT_TOLERANCE, help="fraction a rate may drop below the baseline")
+    parser.add_argument("-json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.sample, args.repeat)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare(results, json.load(file), args.tolerance)
+        print()
+        print(format_comparison(comparison))
+        n_regressions = sum(c["regression"] for c in comparison)
+        if n_regressions:
+            print(f"\n{n_regressions} cases are more than {args.tolerance:.0%} slower than the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
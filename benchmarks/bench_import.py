@@ -0,0 +1,89 @@
+"""Checks that `import ccache` stays cheap for processes that only use the engine.
+
+Imports ccache in new interpreters and reports the median import time. The
+check fails, with exit status 1, if the median exceeds the budget, if the
+import loaded a module of the CLI, or if the import touched the command line
+history, e.g. when a pool worker imports ccache.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py -runs 20 -budget-ms 80
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_RUNS = 10
+DEFAULT_BUDGET_MS = 150.0
+"""The median import time allowed. Machines differ, so set it with `-budget-ms` for yours."""
+
+CLI_MODULES = ("ccache.interface", "curses", "readline", "asyncio")
+"""Modules the library import must not load. asyncio is only needed by the async API."""
+
+HISTORY_FILE_NAME = ".ccache_history"
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import ccache
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (CLI_MODULES,)
+
+
+def import_once(home_dir: str) -> dict:
+    """Imports ccache in a new interpreter whose home directory is `home_dir`."""
+    env = dict(os.environ, HOME=home_dir)
+    out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def run_benchmark(n_runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as home_dir:
+        runs = [import_once(home_dir) for _ in range(n_runs)]
+        touched_history = os.path.exists(os.path.join(home_dir, HISTORY_FILE_NAME))
+
+    times_ms = [run["seconds"] * 1e3 for run in runs]
+    return {
+        "runs": n_runs,
+        "median_ms": statistics.median(times_ms),
+        "min_ms": min(times_ms),
+        "max_ms": max(times_ms),
+        "loaded_cli_modules": sorted({m for run in runs for m in run["loaded"]}),
+        "touched_history": touched_history,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-runs", type=int, default=DEFAULT_RUNS, help="number of interpreters to import ccache in")
+    parser.add_argument("-budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="median import time allowed")
+    parser.add_argument("-json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.runs)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import ccache: median {result['median_ms']:.1f} ms (min {result['min_ms']:.1f}, max {result['max_ms']:.1f}) over {args.runs} runs")
+
+    failures = []
+    if result["median_ms"] > args.budget_ms:
+        failures.append(f"the median import time {result['median_ms']:.1f} ms exceeds the budget of {args.budget_ms:.1f} ms")
+    if result["loaded_cli_modules"]:
+        failures.append(f"the import loaded {', '.join(result['loaded_cli_modules'])}")
+    if result["touched_history"]:
+        failures.append(f"the import wrote ~/{HISTORY_FILE_NAME}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
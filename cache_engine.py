@@ -1,21 +1,74 @@
+import contextlib
 from dataclasses import dataclass, field
+import functools
+import importlib
 import inspect
-from typing import Any, Callable
-from .computation_object_data import ComputationObjectData
+import itertools
+from typing import Any, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from .computation_object_data import (
+    ComputationObjectData,
+    IDENTITY_HASH,
+    IDENTITY_CONTENT,
+    IDENTITY_KEY,
+    IDENTITY_MODES,
+)
 from .computation_object_metadata import ComputationObjectMetadata
 from .compute_function import In, Out, ComputationFunction, Void
 from . import sqltypes as sqlt
 import os
 import uuid
-from .db_manager import DBManager
+import hashlib
+import mmap
+import threading
+import time
+import weakref
+from .db_manager import DBManager, MIGRATION_BATCH_SIZE
+from .object_cache import ObjectCache
+from .profiling import ExecProfile, PHASE_FUNCTION, PHASE_SAVE
+from .timings import (
+    Timings,
+    CATEGORY_SAVE,
+    CATEGORY_SAVE_METHOD,
+    CATEGORY_LOAD,
+    CATEGORY_LOAD_METHOD,
+    CATEGORY_FUNCTION,
+)
+from .object_layout import ObjectLayout, FLAT_LAYOUT
+from . import payload_codecs as codecs
 
 # TODO: factor out magic strings
 
 IS_SAVE_METHOD_FLAG = "_is_save_method"
 SAVE_METHOD_NAME = "save_method"
 IS_LOAD_METHOD_FLAG = "_is_load_method"
+IS_BUFFER_METHOD_FLAG = "_is_buffer_method"
 LOAD_METHOD_NAME = "load_method"
 METADATA_TUPLE_NAME = "metadata_tuple"
+IS_IDENTITY_KEY_FLAG = "_is_identity_key"
+DIGEST_SIZE = 16
+DIGEST_CHUNK_SIZE = 1 << 20
+WRITE_CHUNK_SIZE = 1 << 20
+TMP_FILE_PREFIX = ".tmp-"
+OBJ_LAYOUT_META_KEY = "obj_layout"
+PREV_OBJ_LAYOUT_META_KEY = "prev_obj_layout"
+"""Set while a migration between object layouts is in progress."""
+BULK_SAVE_BATCH_SIZE = 1000
+BACKFILL_BATCH_SIZE = 1000
+PROCESS_CHUNKS_PER_WORKER = 4
+ASYNC_MAX_WORKERS = 32
+ASYNC_TYPE_LIMIT = 8
+METADATA_MIGRATION_PAUSE = 0.01
+"""Seconds a background metadata migration waits between batches, so that saves get the write lock."""
+EVICTION_LRU = "lru"
+EVICTION_COST = "cost"
+EVICTION_POLICIES = (EVICTION_LRU, EVICTION_COST)
+EVICTION_BATCH_SIZE = 1000
+EVICTION_CHECK_FRACTION = 0.05
+"""With automatic eviction, the store is checked whenever this fraction of the quota has been saved."""
+USAGE_FLUSH_SIZE = 1000
+USAGE_FLUSH_INTERVAL = 30.0
+"""Seconds after which recorded payload sizes and access times are written to the database."""
 
 
 
@@ -26,8 +79,52 @@ class CacheEngine:
     _obj_dir = os.path.join(_data_dir,"objs")
     _db_dir = os.path.join(_data_dir,"db")
 
+    _obj_layout: ObjectLayout = ObjectLayout()
+    """The layout payloads are written in. Loaded from the database in `initialize()`."""
+    _prev_obj_layout: ObjectLayout | None = None
+    """The layout payloads are migrated from, if a migration is in progress."""
+    _compressed_identifiers: set[str] = set()
+    """Identifiers of computation objects that have payloads written with a codec.
+    Loaded in `initialize()`."""
+
+    _shard_dirs: set[str] = set()
+    """Shard directories known to exist, to avoid a `makedirs` call per write."""
+
     _current_computation_object_type: type = None
 
+    _object_uids: dict[int, tuple[weakref.ref, str]] = {}
+    """id of a saved or loaded object -> (weak reference to the object, its uid). The uids
+    are kept outside the objects, so that copies of an object do not inherit its uid."""
+
+    _object_cache: ObjectCache = ObjectCache()
+    """LRU cache of loaded objects in front of `load_object`. Configured with
+    `configure_object_cache`."""
+
+    _async_executor: ThreadPoolExecutor | None = None
+    """Runs the blocking work of the async methods. Created on first use."""
+    _async_max_workers: int = ASYNC_MAX_WORKERS
+    _async_type_limit: int = ASYNC_TYPE_LIMIT
+    _async_type_limits: dict[str, int] = {}
+    """Concurrency limits of the async methods per computation object identifier,
+    overriding `_async_type_limit`."""
+    _async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+    """The semaphores enforcing the type limits, per event loop since asyncio
+    primitives can not be shared between loops."""
+
+    _eviction_max_bytes: int | None = None
+    _eviction_ttls: dict[str, float] = {}
+    """Seconds objects of a computation object identifier are kept after their last access."""
+    _eviction_policy: str = EVICTION_LRU
+    _eviction_auto: bool = False
+    _bytes_since_eviction: int = 0
+
+    _usage: dict[str, tuple[int | None, float | None]] = {}
+    """uid -> (payload size, access time) recorded since the last flush to the database."""
+    _usage_lock = threading.Lock()
+    _usage_flushed_at: float = 0.0
+    _usage_pid: int | None = None
+    """The process that opened the store. Worker processes do not record usage, since they do not use the database."""
+
     @staticmethod
     def get_current_computation_object_type():
         return CacheEngine._current_computation_object_type
@@ -53,12 +150,19 @@ class CacheEngine:
         cls: type,
         identifier: str,
         metadata: ComputationObjectMetadata = ComputationObjectMetadata(),
+        identity: str = IDENTITY_HASH,
+        codec: str = codecs.CODEC_NONE,
         ) -> ComputationObjectData:
 
         # check that cls is a type and that the identifier is unique 
         if not isinstance(cls, type):
             raise ValueError(f"{cls} must be a type but was {type(cls)}!")
 
+        if identity not in IDENTITY_MODES:
+            raise ValueError(f"identity must be one of {IDENTITY_MODES}; was {identity}")
+
+        codecs.check_codec(codec)
+
         if identifier in CacheEngine._computation_object_dict:
             raise ValueError(f"the computation object with identifier {identifier} already exists, can not register it again!")
 
@@ -69,6 +173,8 @@ class CacheEngine:
             metadata=metadata,
             object_identifier=identifier,
             cls=cls,
+            identity=identity,
+            codec=codec,
         )
 
         # Store the objects data and its identifier in the dicts
@@ -106,39 +212,639 @@ class CacheEngine:
     def get_co_hash(obj: Any) -> str:
         """
         Returns the hash for a computation object. Used to refer to a computation object.
+
+        How the hash is derived depends on the `identity` of the object's type:
+        `"hash"` uses the built-in `hash()`, which is not stable across processes
+        for str and bytes values. `"key"` and `"content"` use a blake2b digest of the
+        `@identity_key` value or of the saved bytes, which is stable across
+        processes and machines.
         """
+        identifier = CacheEngine._computation_object_type_to_identifier_dict.get(type(obj))
+        if identifier is None:
+            return str(hex(hash(obj)))[2:]
+        obj_data = CacheEngine._computation_object_dict[identifier]
+
+        if obj_data.identity == IDENTITY_KEY:
+            key = getattr(obj, obj_data.identity_key_method)()
+            if isinstance(key, str):
+                key = key.encode("utf-8")
+            digest = CacheEngine._new_digest(obj_data)
+            digest.update(key)
+            return digest.hexdigest()
+
+        if obj_data.identity == IDENTITY_CONTENT:
+            uid = CacheEngine._get_remembered_uid(obj)
+            if uid is not None:
+                return uid
+
+            # the object has not been saved or loaded, so digest the bytes it would be saved as
+            return CacheEngine._digest_content(obj, obj_data)
+
         return str(hex(hash(obj)))[2:]
 
     @staticmethod
-    def save_object(obj) -> str | None:
-        obj_data = CacheEngine._get_computation_object_data(type(obj))
-        
+    def _digest_content(obj: Any, obj_data: ComputationObjectData) -> str:
+        """Returns the digest of the bytes `obj` would be saved as, which is its uid with content identity."""
+        save_func = CacheEngine._get_save_func(obj, obj_data)
+        digest = CacheEngine._new_digest(obj_data)
+        if obj_data.save_buffer:
+            digest.update(CacheEngine._get_payload_buffer(save_func))
+            return digest.hexdigest()
+
+        tmp_path = CacheEngine._get_tmp_path()
+        try:
+            save_func(tmp_path)
+            CacheEngine._update_digest_from_file(digest, tmp_path)
+            return digest.hexdigest()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _new_digest(obj_data: ComputationObjectData):
+        """Returns a digest seeded with the object identifier, so that equal keys
+        or contents of different types do not collide."""
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        digest.update(obj_data.object_identifier.encode("utf-8"))
+        digest.update(b"\0")
+        return digest
+
+    @staticmethod
+    def _update_digest_from_file(digest, path: str):
+        with open(path, "rb") as file:
+            while chunk := file.read(DIGEST_CHUNK_SIZE):
+                digest.update(chunk)
+
+    @staticmethod
+    def _get_payload_buffer(save_func: Callable) -> memoryview:
+        """Calls a buffer save method and returns its result as a flat byte memoryview."""
+        buf = save_func()
+        try:
+            return memoryview(buf).cast("B")
+        except TypeError as e:
+            raise TypeError(f"a buffer save method must return a C-contiguous bytes-like object; got {type(buf)}: {e}") from e
+
+    @staticmethod
+    def _write_payload(
+        obj_data: ComputationObjectData,
+        save_func: Callable,
+        path: str,
+        digest = None,
+        fsync: bool = True,
+        ):
+        """
+        Writes the payload of an object to `path` with its save method, compressed
+        with the codec of its type, and updates `digest` with the uncompressed
+        bytes if given.
+
+        Payloads returned by buffer save methods are written by the engine, which
+        updates the digest while writing and fsyncs the file if `fsync` is True.
+        Path save methods write the file themselves, so it is read back to update
+        the digest, or to a temporary file which is then compressed into `path`.
+        """
+        with Timings.measure(CATEGORY_SAVE_METHOD, obj_data.object_identifier):
+            if not obj_data.save_buffer and obj_data.codec == codecs.CODEC_NONE:
+                save_func(path)
+                if digest is not None:
+                    CacheEngine._update_digest_from_file(digest, path)
+                return
+
+            if not obj_data.save_buffer:
+                tmp_path = CacheEngine._get_tmp_path()
+                try:
+                    save_func(tmp_path)
+                    with open(tmp_path, "rb") as src, open(path, "wb") as file:
+                        with codecs.wrap_writer(file, obj_data.codec) as dst:
+                            codecs.copy_stream(src, dst, digest)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                return
+
+            buf = CacheEngine._get_payload_buffer(save_func)
+            with open(path, "wb") as file:
+                with codecs.wrap_writer(file, obj_data.codec) as dst:
+                    for i in range(0, len(buf), WRITE_CHUNK_SIZE):
+                        chunk = buf[i:i + WRITE_CHUNK_SIZE]
+                        dst.write(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+                if fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+
+    @staticmethod
+    def _fsync_paths(paths: list[str]):
+        for path in paths:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _map_payload(path: str) -> memoryview:
+        """Returns a read-only memoryview of a payload, backed by a memory map of the file."""
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b"") # empty files can not be mapped
+            # the map stays open for as long as the memoryview, or views of it, are alive
+            return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def _read_payload(path: str, codec: str) -> memoryview:
+        """Returns a read-only memoryview of the decompressed bytes of a compressed payload."""
+        with open(path, "rb") as file:
+            with codecs.wrap_reader(file, codec) as src:
+                return memoryview(src.read())
+
+    @staticmethod
+    def _decompress_payload(path: str, codec: str) -> str:
+        """Decompresses a payload into a temporary file and returns its path. The caller removes the file."""
+        tmp_path = CacheEngine._get_tmp_path()
+        with open(path, "rb") as file, open(tmp_path, "wb") as dst:
+            with codecs.wrap_reader(file, codec) as src:
+                codecs.copy_stream(src, dst)
+        return tmp_path
+
+    @staticmethod
+    def _get_payload_codec(obj_data: ComputationObjectData, uid: str) -> str:
+        """
+        Returns the codec the payload of `uid` was written with. The database is only
+        queried for types that have been written with a codec.
+        """
+        if obj_data.codec == codecs.CODEC_NONE and obj_data.object_identifier not in CacheEngine._compressed_identifiers:
+            return codecs.CODEC_NONE
+        return DBManager.get_codecs([uid]).get(uid, codecs.CODEC_NONE)
+
+    @staticmethod
+    def _get_tmp_path() -> str:
+        return os.path.join(CacheEngine._obj_dir, f"{TMP_FILE_PREFIX}{uuid.uuid4().hex}")
+
+    @staticmethod
+    def _get_write_path(uid: str) -> str:
+        """Returns the path to write the payload of an object to, creating its shard directories."""
+        path = CacheEngine._obj_layout.get_path(CacheEngine._obj_dir, uid)
+        if CacheEngine._obj_layout.depth > 0:
+            shard_dir = os.path.dirname(path)
+            if shard_dir not in CacheEngine._shard_dirs:
+                os.makedirs(shard_dir, exist_ok=True)
+                CacheEngine._shard_dirs.add(shard_dir)
+        return path
+
+    @staticmethod
+    def _get_read_path(uid: str) -> str:
+        """
+        Returns the path to read the payload of an object from. While a layout
+        migration is in progress, payloads that have not been moved yet are
+        read from their path in the previous layout.
+        """
+        path = CacheEngine._obj_layout.get_path(CacheEngine._obj_dir, uid)
+        prev_layout = CacheEngine._prev_obj_layout
+        if prev_layout is not None and not os.path.exists(path):
+            prev_path = prev_layout.get_path(CacheEngine._obj_dir, uid)
+            if os.path.exists(prev_path):
+                return prev_path
+        return path
+
+    @staticmethod
+    def _remember_uid(obj: Any, uid: str):
+        """Remembers the uid an object was saved or loaded under, for as long as the object is alive."""
+        key = id(obj)
+        try:
+            ref = weakref.ref(obj, lambda _, key=key: CacheEngine._object_uids.pop(key, None))
+        except TypeError:
+            return # objects that can not be weakly referenced are digested again when their uid is needed
+        CacheEngine._object_uids[key] = (ref, uid)
+
+    @staticmethod
+    def _get_remembered_uid(obj: Any) -> str | None:
+        """Returns the uid `obj` was last saved or loaded under, or None if it was neither."""
+        entry = CacheEngine._object_uids.get(id(obj))
+        if entry is None or entry[0]() is not obj:
+            return None
+        return entry[1]
+
+    @staticmethod
+    def _get_save_func(obj: Any, obj_data: ComputationObjectData) -> Callable:
         # check that the object has a save method
         save_func = getattr(obj, obj_data.save_method, None)
         if save_func is None:
             raise ValueError(f"the computattion object of type {type(obj)} did not have a save function defined!")
-        check_saveload_func_signature(save_func) # verify correct signature
+        check_saveload_func_signature(save_func, obj_data.save_buffer) # verify correct signature
+        return save_func
+
+    @staticmethod
+    def save_object(obj, skip_existing: bool = False) -> str | None:
+        """
+        Saves a computation object and returns its uid, or None if it could not be saved.
+        If `skip_existing` is True, an object that already exists in the database is
+        not saved again and its uid is returned.
+        """
+        obj_data = CacheEngine._get_computation_object_data(type(obj))
+        with Timings.measure(CATEGORY_SAVE, obj_data.object_identifier):
+            save_func = CacheEngine._get_save_func(obj, obj_data)
+
+            if obj_data.identity == IDENTITY_CONTENT:
+                return CacheEngine._save_content_identified_object(obj, obj_data, save_func, skip_existing)
+
+            uid = CacheEngine.get_co_hash(obj)
+            if skip_existing and DBManager.computation_object_exists(uid):
+                CacheEngine._remember_uid(obj, uid)
+                return uid
+
+            try:
+                DBManager.insert_computation_object(obj, uid, obj_data)
+            except Exception as e:
+                CacheEngine._report_insert_error(obj, e)
+                return None
+
+            path = CacheEngine._get_write_path(uid)
+            CacheEngine._write_payload(obj_data, save_func, path)
+            CacheEngine._remember_uid(obj, uid)
+            CacheEngine._record_usage(uid, os.path.getsize(path))
+
+            return uid
+
+    @staticmethod
+    def save_objects(objs: Iterable[Any], batch_size: int = BULK_SAVE_BATCH_SIZE, skip_existing: bool = False) -> list[str | None]:
+        """
+        Saves many computation objects and returns their uids in order.
+
+        Objects are saved in batches of `batch_size`. Each batch resolves the
+        relation once per type, inserts its metadata rows with `executemany`
+        and commits once. Objects that already exist in the database are
+        reported and get None as uid (or their uid if `skip_existing` is True)
+        without aborting the rest of the batch.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1; was {batch_size}")
+
+        uids = []
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                uids.extend(CacheEngine._save_batch(batch, skip_existing))
+                batch = []
+        if batch:
+            uids.extend(CacheEngine._save_batch(batch, skip_existing))
 
-        uid = CacheEngine.get_co_hash(obj)
-        path = os.path.join(CacheEngine._obj_dir,uid)
+        return uids
 
+    @staticmethod
+    def _save_batch(objs: list[Any], skip_existing: bool) -> list[str | None]:
+        # group the objects by type so that each relation is resolved once
+        groups: dict[type, list[int]] = {}
+        for idx, obj in enumerate(objs):
+            groups.setdefault(type(obj), []).append(idx)
+
+        uids: list[str | None] = [None] * len(objs)
+        tmp_paths: dict[int, str] = {}
+        written_paths: dict[str, str] = {}
+        inserted_idxs = set()
         try:
-            DBManager.insert_computation_object(obj, uid, obj_data)
-        except Exception as e:
-            print(f"Could not save object of type {type(obj)} to the database: {e}")
-            if "UNIQUE" in str(e):
-                print("This is likely because an identical object with the same hash already exists in the database. \nDelete it or change the hash function!")
-            return None
+            # save, digest and compute the metadata of the objects before taking the write lock,
+            # which is then only held to insert the rows and move the payloads into place
+            to_insert: list[tuple[ComputationObjectData, dict[str, tuple[int, dict]]]] = []
+            buffer_paths = [] # payloads written by the engine, fsynced together before committing
+            for cls, idxs in groups.items():
+                obj_data = CacheEngine._get_computation_object_data(cls)
+                save_funcs = {idx: CacheEngine._get_save_func(objs[idx], obj_data) for idx in idxs}
+
+                # find the uids, saving content identified objects to temporary files
+                for idx in idxs:
+                    if obj_data.identity == IDENTITY_CONTENT:
+                        tmp_paths[idx] = CacheEngine._get_tmp_path()
+                        digest = CacheEngine._new_digest(obj_data)
+                        CacheEngine._write_payload(obj_data, save_funcs[idx], tmp_paths[idx], digest, fsync=False)
+                        uids[idx] = digest.hexdigest()
+                    else:
+                        uids[idx] = CacheEngine.get_co_hash(objs[idx])
+
+                # save the objects that are not stored yet, once per uid
+                existing = DBManager.get_existing_uids([uids[idx] for idx in idxs])
+                rows: dict[str, tuple[int, dict]] = {}
+                for idx in idxs:
+                    uid = uids[idx]
+                    if uid in existing or uid in rows:
+                        continue
+                    if idx not in tmp_paths:
+                        tmp_paths[idx] = CacheEngine._get_tmp_path()
+                        CacheEngine._write_payload(obj_data, save_funcs[idx], tmp_paths[idx], fsync=False)
+                    if obj_data.save_buffer:
+                        buffer_paths.append(tmp_paths[idx])
+                    rows[uid] = (idx, obj_data.metadata.compute_metadata(objs[idx]))
+                to_insert.append((obj_data, rows))
+
+            CacheEngine._fsync_paths(buffer_paths)
+
+            try:
+                with DBManager.transaction():
+                    for obj_data, rows in to_insert:
+                        conflicts = DBManager.insert_computation_object_rows(
+                            [(uid, metadata) for uid, (_, metadata) in rows.items()], obj_data
+                            )
+                        for uid, (idx, _) in rows.items():
+                            if uid not in conflicts:
+                                path = CacheEngine._get_write_path(uid)
+                                os.replace(tmp_paths.pop(idx), path)
+                                written_paths[uid] = path
+                                inserted_idxs.add(idx)
+            except BaseException:
+                # the rows of the payloads were rolled back
+                for path in written_paths.values():
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+        finally:
+            for tmp_path in tmp_paths.values():
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
 
-        save_func(path)
+        # report the objects that were stored already, or more than once in the batch
+        for idx, (obj, uid) in enumerate(zip(objs, uids)):
+            if idx in inserted_idxs or skip_existing:
+                CacheEngine._remember_uid(obj, uid)
+            else:
+                print(f"Could not save object of type {type(obj)} with uid {uid}: an object with the same uid already exists.")
+                uids[idx] = None
 
+        # measure all payloads first, since recording usage may evict objects of the batch
+        sizes = {uid: os.path.getsize(path) for uid, path in written_paths.items()}
+        for uid, size in sizes.items():
+            CacheEngine._record_usage(uid, size)
+        return uids
+
+    @staticmethod
+    def _save_content_identified_object(
+        obj: Any,
+        obj_data: ComputationObjectData,
+        save_func: Callable,
+        skip_existing: bool,
+        ) -> str | None:
+        """
+        Saves an object whose uid is the digest of its saved bytes. The object is
+        saved to a temporary file which is digested and then renamed to the uid.
+        """
+        tmp_path = CacheEngine._get_tmp_path()
+        try:
+            digest = CacheEngine._new_digest(obj_data)
+            CacheEngine._write_payload(obj_data, save_func, tmp_path, digest)
+            uid = digest.hexdigest()
+            CacheEngine._remember_uid(obj, uid)
+
+            if skip_existing and DBManager.computation_object_exists(uid):
+                return uid
+
+            try:
+                DBManager.insert_computation_object(obj, uid, obj_data)
+            except Exception as e:
+                CacheEngine._report_insert_error(obj, e)
+                return None
+
+            path = CacheEngine._get_write_path(uid)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        CacheEngine._record_usage(uid, os.path.getsize(path))
         return uid
 
     @staticmethod
-    def load_object(identifier_or_type: str | type, uid: str) -> any:
+    def _report_insert_error(obj: Any, e: Exception):
+        print(f"Could not save object of type {type(obj)} to the database: {e}")
+        if "UNIQUE" in str(e):
+            print("This is likely because an identical object with the same hash already exists in the database. \nDelete it or change the hash function!")
+
+    @staticmethod
+    def configure_object_cache(max_bytes: int | None = None, sizer: Callable[[Any], int] | None = None):
+        """
+        Replaces the object cache in front of `load_object` with an empty one.
+
+        :param max_bytes: The memory budget of the cache. 0 disables caching.
+            Defaults to the budget of the current cache.
+        :param sizer: Estimates the size of an object in bytes, instead of the
+            size of its decoded payload. Defaults to the sizer of the current cache,
+            initially none.
+        """
+        current = CacheEngine._object_cache
+        CacheEngine._object_cache = ObjectCache(
+            max_bytes=current.max_bytes if max_bytes is None else max_bytes,
+            sizer=current.sizer if sizer is None else sizer,
+        )
+
+    @staticmethod
+    def get_object_cache_stats() -> dict:
+        """Returns the hit, miss and eviction counters and the usage of the object cache."""
+        return CacheEngine._object_cache.stats()
+
+    @staticmethod
+    def get_timing_stats(category: str | None = None) -> list[dict]:
+        """
+        Returns the call counts, latency percentiles and throughput of the timed operations,
+        see `Timings.get_stats`. The categories are `"save"` and `"load"` per type,
+        `"save_method"` and `"load_method"` for writing and reading payloads per type,
+        `"metadata"` per metadata setter, `"db"` per `DBManager` method and `"function"`
+        per computation function.
+        """
+        return Timings.get_stats(category)
+
+    @staticmethod
+    def _record_usage(uid: str, size: int | None = None):
+        """
+        Records that an object was saved or loaded now, and its payload size if given.
+        The records are written to the database in batches by `flush_usage`.
+        """
+        if CacheEngine._usage_pid != os.getpid():
+            return
+
+        now = time.time()
+        with CacheEngine._usage_lock:
+            prev_size = CacheEngine._usage.get(uid, (None, None))[0]
+            CacheEngine._usage[uid] = (size if size is not None else prev_size, now)
+            flush = len(CacheEngine._usage) >= USAGE_FLUSH_SIZE or now - CacheEngine._usage_flushed_at >= USAGE_FLUSH_INTERVAL
+
+        if flush:
+            CacheEngine.flush_usage()
+
+        if size is not None and CacheEngine._eviction_auto and CacheEngine._eviction_max_bytes is not None:
+            CacheEngine._bytes_since_eviction += size
+            # evict between transactions only, since payloads are removed after committing
+            if (
+                CacheEngine._bytes_since_eviction >= CacheEngine._eviction_max_bytes * EVICTION_CHECK_FRACTION
+                and not DBManager.conn.in_transaction
+                ):
+                CacheEngine.evict()
+
+    @staticmethod
+    def flush_usage():
+        """Writes the payload sizes and access times recorded since the last flush to the database."""
+        with CacheEngine._usage_lock:
+            usage = CacheEngine._usage
+            CacheEngine._usage = {}
+            CacheEngine._usage_flushed_at = time.time()
+
+        try:
+            DBManager.record_usage([(uid, size, last_access) for uid, (size, last_access) in usage.items()])
+        except Exception as e:
+            print(f"Could not record the usage of {len(usage)} objects: {e}")
+
+    @staticmethod
+    def configure_eviction(
+        max_bytes: int | None = None,
+        ttls: dict[str | type, float] | None = None,
+        policy: str | None = None,
+        auto: bool | None = None,
+        ):
+        """
+        Configures which objects `evict` removes from the store. Arguments that are
+        None keep their current value.
+
+        :param max_bytes: The quota of the payloads in the object directory in bytes.
+            Objects are evicted until the payloads fit. 0 removes the quota.
+        :param ttls: Seconds after their last save or load that objects of a
+            computation object identifier or type are evicted, e.g. `{MyNumber: 86400}`.
+        :param policy: `"lru"` evicts the least recently used objects first, and
+            `"cost"` the objects with the largest size times time since their last use,
+            so that large objects go before small ones.
+        :param auto: If True, `evict` is called while saving whenever a twentieth
+            of the quota has been saved since the last check.
+        """
+        if max_bytes is not None:
+            if max_bytes < 0:
+                raise ValueError(f"max_bytes must be non-negative; was {max_bytes}")
+            CacheEngine._eviction_max_bytes = max_bytes or None
+        if ttls is not None:
+            CacheEngine._eviction_ttls = {
+                CacheEngine._get_computation_object_data(identifier_or_type).object_identifier: ttl
+                for identifier_or_type, ttl in ttls.items()
+            }
+        if policy is not None:
+            if policy not in EVICTION_POLICIES:
+                raise ValueError(f"policy must be one of {EVICTION_POLICIES}; was {policy}")
+            CacheEngine._eviction_policy = policy
+        if auto is not None:
+            CacheEngine._eviction_auto = auto
+
+    @staticmethod
+    def pin_objects(uids: Iterable[str], pinned: bool = True):
+        """Pins objects so that they are never evicted, or unpins them if `pinned` is False."""
+        DBManager.set_pinned(list(uids), pinned)
+
+    @staticmethod
+    def evict(dry_run: bool = False) -> dict:
+        """
+        Removes objects from the store according to `configure_eviction`: the objects
+        whose TTL has expired, and then objects in the order of the eviction policy
+        until the payloads fit in the quota. Pinned objects and objects that are inputs
+        of memoized results without being results themselves are never evicted.
+
+        The database rows of the objects are removed before their payloads, in
+        transactions of `EVICTION_BATCH_SIZE` objects, so that an interrupted
+        eviction leaves no rows without payloads. Payloads of objects that were
+        saved again meanwhile are kept.
+
+        Returns the number of evicted objects, the freed bytes and the size of the
+        store afterwards. With `dry_run`, only reports what would be evicted.
+        """
+        if DBManager.conn.in_transaction:
+            raise RuntimeError("evict can not be called in a transaction, since payloads are removed after committing")
+
+        CacheEngine.flush_usage()
+        CacheEngine._record_missing_sizes()
+        CacheEngine._bytes_since_eviction = 0
+
+        by_size = CacheEngine._eviction_policy == EVICTION_COST
+        to_evict: dict[str, int] = {}
+
+        now = time.time()
+        for identifier, ttl in CacheEngine._eviction_ttls.items():
+            for uid, size in DBManager.iter_eviction_candidates(by_size, identifier, accessed_before=now - ttl):
+                to_evict[uid] = size
+
+        store_bytes = DBManager.get_store_size() - sum(to_evict.values())
+        max_bytes = CacheEngine._eviction_max_bytes
+        if max_bytes is not None and store_bytes > max_bytes:
+            candidates = DBManager.iter_eviction_candidates(by_size)
+            for uid, size in candidates:
+                if store_bytes <= max_bytes:
+                    break
+                if uid in to_evict:
+                    continue
+                to_evict[uid] = size
+                store_bytes -= size
+            candidates.close()
+
+        if not dry_run:
+            CacheEngine._remove_objects(list(to_evict))
+
+        return {"evicted": len(to_evict), "freed_bytes": sum(to_evict.values()), "store_bytes": store_bytes}
+
+    @staticmethod
+    def _record_missing_sizes():
+        """Records the payload sizes of objects saved before sizes were recorded."""
+        after_uid = None
+        while uids := DBManager.get_uids_without_size(after_uid):
+            after_uid = uids[-1]
+            rows = []
+            for uid in uids:
+                path = CacheEngine._get_read_path(uid)
+                rows.append((uid, os.path.getsize(path) if os.path.exists(path) else 0, None))
+            DBManager.record_usage(rows)
+
+    @staticmethod
+    def _remove_objects(uids: list[str]):
+        for i in range(0, len(uids), EVICTION_BATCH_SIZE):
+            batch = uids[i:i + EVICTION_BATCH_SIZE]
+            paths = {uid: CacheEngine._get_read_path(uid) for uid in batch}
+            DBManager.delete_computation_objects(batch)
+
+            saved_again = DBManager.get_existing_uids(batch)
+            for uid, path in paths.items():
+                CacheEngine._object_cache.discard(uid)
+                if uid in saved_again:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def load_object(identifier_or_type: str | type, uid: str, use_cache: bool = True, codec: str | None = None) -> any:
+        """
+        Loads the computation object with the given uid.
+
+        Loaded objects are kept in an LRU cache, so loading the same uid again
+        returns the same instance without reading the file. Do not mutate
+        loaded objects, or pass `use_cache=False` to get a fresh instance.
+
+        `codec` is the codec the payload was written with. It is looked up in the
+        database if not given.
+        """
 
         # create a new instance of the object
         obj_data = CacheEngine._get_computation_object_data(identifier_or_type)
+        if use_cache:
+            cached_obj = CacheEngine._object_cache.get(uid, obj_data.cls)
+            if cached_obj is not None:
+                CacheEngine._record_usage(uid)
+                return cached_obj
+
+        start = time.perf_counter()
+        new_obj, size = CacheEngine._load_payload(obj_data, uid, codec)
+        CacheEngine._remember_uid(new_obj, uid)
+
+        if use_cache:
+            CacheEngine._object_cache.put(uid, new_obj, size)
+        CacheEngine._record_usage(uid)
+        Timings.record(CATEGORY_LOAD, obj_data.object_identifier, time.perf_counter() - start)
+        return new_obj
+
+    @staticmethod
+    def _load_payload(obj_data: ComputationObjectData, uid: str, codec: str | None) -> tuple[Any, int]:
+        """Loads the object with the given uid and returns it with the size of its decoded payload in bytes."""
         new_obj = object.__new__(obj_data.cls)
 
         # check that the object has a load method
@@ -148,30 +854,442 @@ class CacheEngine:
         check_saveload_func_signature(load_func) # verify correct signature
 
         # load the object
-        path = os.path.join(CacheEngine._obj_dir,uid)
-        load_func(path)
-        return new_obj
+        path = CacheEngine._get_read_path(uid)
+        if codec is None:
+            codec = CacheEngine._get_payload_codec(obj_data, uid)
+
+        with Timings.measure(CATEGORY_LOAD_METHOD, obj_data.object_identifier):
+            if codec == codecs.CODEC_NONE:
+                size = os.path.getsize(path)
+                if obj_data.load_buffer:
+                    load_func(CacheEngine._map_payload(path))
+                else:
+                    load_func(path)
+            elif obj_data.load_buffer:
+                buf = CacheEngine._read_payload(path, codec)
+                size = buf.nbytes
+                load_func(buf)
+            else:
+                tmp_path = CacheEngine._decompress_payload(path, codec)
+                try:
+                    size = os.path.getsize(tmp_path)
+                    load_func(tmp_path)
+                finally:
+                    os.remove(tmp_path)
+
+        return new_obj, size
     
     @staticmethod
-    def get_metadatas_for_computation_objects(objs: list[Any]):
+    def load_objects(
+        pairs: Iterable[tuple[str | type, str]],
+        workers: int | None = None,
+        use_processes: bool = False,
+        ) -> list[Any]:
+        """
+        Loads many computation objects and returns them in the order of `pairs`,
+        which contains `(identifier_or_type, uid)` tuples.
+
+        Objects are loaded on a thread pool with `workers` threads, which suits
+        loaders bound by file I/O. Set `use_processes` to load on a process pool
+        instead, for loaders bound by CPU. The computation object types must then
+        be picklable and defined at module level, see `_new_process_pool`.
+        `workers=1` loads the objects serially.
+        """
+        pairs = list(pairs)
+        objs = [None] * len(pairs)
+        for idx, obj in CacheEngine.iter_load_objects(pairs, workers, use_processes):
+            objs[idx] = obj
+        return objs
+
+    @staticmethod
+    def _get_load_args(pairs: list[tuple[str | type, str]]) -> list[tuple[str, str, str]]:
+        """
+        Returns the `(identifier, uid, codec)` arguments of `load_object` for each
+        pair. The codecs are looked up in bulk up front, which also keeps process
+        workers off the database.
+        """
+        obj_datas = [CacheEngine._get_computation_object_data(identifier_or_type) for identifier_or_type, _ in pairs]
+        lookup_uids = [
+            uid for obj_data, (_, uid) in zip(obj_datas, pairs)
+            if obj_data.codec != codecs.CODEC_NONE or obj_data.object_identifier in CacheEngine._compressed_identifiers
+        ]
+        codec_dict = DBManager.get_codecs(lookup_uids) if lookup_uids else {}
+        return [
+            (obj_data.object_identifier, uid, codec_dict.get(uid, codecs.CODEC_NONE))
+            for obj_data, (_, uid) in zip(obj_datas, pairs)
+        ]
+
+    @staticmethod
+    def iter_load_objects(
+        pairs: Iterable[tuple[str | type, str]],
+        workers: int | None = None,
+        use_processes: bool = False,
+        ) -> Iterator[tuple[int, Any]]:
+        """
+        Loads many computation objects like `load_objects`, but yields
+        `(index, obj)` tuples as soon as each object has been loaded, where
+        `index` is the position of the object in `pairs`.
+        """
+        pairs = list(pairs)
+        if workers == 1 or len(pairs) <= 1:
+            for idx, (identifier_or_type, uid) in enumerate(pairs):
+                yield idx, CacheEngine.load_object(identifier_or_type, uid)
+            return
+
+        items = [(idx, *load_args) for idx, load_args in enumerate(CacheEngine._get_load_args(pairs))]
+
+        if use_processes:
+            n_workers = workers or os.cpu_count() or 1
+            with CacheEngine._new_process_pool(n_workers) as executor:
+                for idx, obj, size in CacheEngine._iter_chunk_results(executor, n_workers, items, _load_objects_in_worker):
+                    CacheEngine._remember_uid(obj, items[idx][2])
+                    CacheEngine._object_cache.put(items[idx][2], obj, size)
+                    CacheEngine._record_usage(items[idx][2])
+                    yield idx, obj
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(CacheEngine.load_object, identifier, uid, codec=codec): idx
+                for idx, identifier, uid, codec in items
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    @staticmethod
+    def get_metadatas_for_computation_objects(objs: list[Any], recompute: bool = False):
         """
         Returns a list of metadata dicts for the given computation objects.
         Each metadata dict contains the metadata variables and their values.
         The dicts also contain the "uid" key with the computation object hash as value.
+
+        The metadata is read from the stored rows of the objects with one query per
+        chunk of uids. The metadata setters are only run for objects that are not
+        stored, or for all objects if `recompute` is True.
         """
+        if not objs:
+            return []
+
         co_data = CacheEngine._get_computation_object_data(type(objs[0]))
+        uids = [CacheEngine.get_co_hash(obj) for obj in objs]
+        stored = {}
+        if not recompute:
+            stored = {row["uid"]: dict(row) for row in DBManager.iter_rows_for_obj_uids(uids, co_data)}
+
         metadatas = [
-            {"uid": CacheEngine.get_co_hash(obj), **co_data.metadata.compute_metadata(obj)}
-            for obj in objs
+            stored.get(uid) or {"uid": uid, **co_data.metadata.compute_metadata(obj)}
+            for uid, obj in zip(uids, objs)
         ]
         return metadatas
 
     @staticmethod
-    def initialize():
-        DBManager.initialize(CacheEngine._db_dir)
+    def initialize(concurrent: bool = False):
+        """
+        Opens the store in the working directory, creating it if necessary.
+        Pass `concurrent=True` when several processes save to the store at the
+        same time, see `DBManager.initialize`.
+        """
+        os.makedirs(CacheEngine._obj_dir, exist_ok=True)
+        # the shard directories of a store opened before may not exist in this one
+        CacheEngine._shard_dirs.clear()
+        DBManager.initialize(CacheEngine._db_dir, concurrent=concurrent)
+        CacheEngine._load_obj_layout()
+        CacheEngine._compressed_identifiers = DBManager.get_compressed_co_identifiers()
+        CacheEngine._usage = {}
+        CacheEngine._usage_pid = os.getpid()
+
+    @staticmethod
+    def _load_obj_layout():
+        layout = DBManager.get_meta(OBJ_LAYOUT_META_KEY)
+        if layout is None:
+            # stores created before payloads were sharded keep the flat layout until migrated
+            layout = FLAT_LAYOUT if DBManager.has_computation_objects() else ObjectLayout()
+            DBManager.set_meta(OBJ_LAYOUT_META_KEY, layout.to_string())
+        else:
+            layout = ObjectLayout.from_string(layout)
+
+        prev_layout = DBManager.get_meta(PREV_OBJ_LAYOUT_META_KEY)
+
+        CacheEngine._obj_layout = layout
+        CacheEngine._prev_obj_layout = None if prev_layout is None else ObjectLayout.from_string(prev_layout)
+
+    @staticmethod
+    def migrate_obj_layout(layout: ObjectLayout, workers: int | None = None) -> int:
+        """
+        Moves all payloads in the object directory into `layout` on a thread pool
+        and returns the number of moved payloads.
+
+        New payloads are written in `layout` as soon as the migration starts, and
+        payloads that have not been moved yet stay readable. If the migration is
+        interrupted, calling this again with the same layout resumes it.
+        Other processes using the store pick up the new layout when they call
+        `initialize()`, so stop processes that save objects before migrating.
+        """
+        if CacheEngine._prev_obj_layout is not None and layout != CacheEngine._obj_layout:
+            raise RuntimeError(
+                f"a migration to the layout {CacheEngine._obj_layout.to_string()} is in progress; "
+                "finish it before migrating to another layout"
+                )
+
+        if layout != CacheEngine._obj_layout:
+            DBManager.set_meta(PREV_OBJ_LAYOUT_META_KEY, CacheEngine._obj_layout.to_string())
+            DBManager.set_meta(OBJ_LAYOUT_META_KEY, layout.to_string())
+            CacheEngine._prev_obj_layout = CacheEngine._obj_layout
+            CacheEngine._obj_layout = layout
+
+        def move(path: str) -> bool:
+            target = CacheEngine._get_write_path(os.path.basename(path))
+            if path == target:
+                return False
+            os.replace(path, target)
+            return True
+
+        # collect the payloads, which may be in any layout if earlier migrations were interrupted
+        paths = [
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(CacheEngine._obj_dir)
+            for filename in filenames
+            if not filename.startswith(TMP_FILE_PREFIX)
+        ]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            n_moved = sum(executor.map(move, paths, chunksize=256))
+
+        # remove the shard directories that are empty after the migration
+        CacheEngine._shard_dirs.clear()
+        for dirpath, _, _ in os.walk(CacheEngine._obj_dir, topdown=False):
+            if dirpath != CacheEngine._obj_dir and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass # a payload was written to the directory meanwhile
+
+        DBManager.set_meta(PREV_OBJ_LAYOUT_META_KEY, None)
+        CacheEngine._prev_obj_layout = None
+        return n_moved
+
+    @staticmethod
+    def migrate_metadata(
+        identifier_or_type: str | type | None = None,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        pause: float = 0.0,
+        ) -> int:
+        """
+        Copies the metadata rows saved before the metadata of a computation object
+        changed into its current relation, `batch_size` rows per write transaction,
+        and returns the number of copied rows. Migrates all computation objects if
+        `identifier_or_type` is None.
+
+        Until a migration is done, queries read the copied and the not yet copied
+        rows through a view. The progress is stored after every batch, so calling
+        this again resumes an interrupted migration. See `DBManager.get_relation_migrations`
+        for the progress.
+        """
+        co_identifier = None
+        if identifier_or_type is not None:
+            co_identifier = CacheEngine._get_computation_object_data(identifier_or_type).object_identifier
+        return DBManager.migrate_relations(co_identifier, batch_size, pause)
+
+    @staticmethod
+    def start_metadata_migration(
+        identifier_or_type: str | type | None = None,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        pause: float = METADATA_MIGRATION_PAUSE,
+        ) -> threading.Thread:
+        """
+        Runs `migrate_metadata` on a daemon thread and returns the thread. Objects can
+        be saved and queried meanwhile, since every batch holds the write lock briefly.
+        """
+        def run():
+            try:
+                CacheEngine.migrate_metadata(identifier_or_type, batch_size, pause)
+            except Exception as e:
+                print(f"The metadata migration failed and can be resumed later: {e}")
+
+        thread = threading.Thread(target=run, name="ccache-metadata-migration", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def backfill_metadata(
+        identifier_or_type: str | type,
+        workers: int | None = None,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        max_rate: float | None = None,
+        on_batch: Callable[[int, int, int], None] | None = None,
+        ) -> int:
+        """
+        Computes the metadata variables that stored objects are missing because the
+        variables were added after the objects were saved, and returns the number of
+        updated objects.
+
+        The objects are loaded and only the setters of their missing variables are run,
+        on a process pool with `workers` processes, or in this process if `workers` is 1.
+        The results are written in one transaction per `batch_size` objects. `max_rate`
+        limits the objects processed per second on average, so that the backfill can run
+        next to other work. `on_batch` is called with the numbers of updated, failed and
+        copied objects after every batch.
+
+        Rows of objects saved before the metadata changed are first copied into the
+        current relation, `batch_size` rows per transaction, like `migrate_metadata`.
+        The copying pauses between batches and is limited by `max_rate` as well.
+
+        Updated objects are marked in the same transaction, so an interrupted backfill
+        continues with the objects that are left when called again. Objects that fail
+        to load or compute are reported and retried by the next call.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1; was {batch_size}")
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError(f"max_rate must be positive; was {max_rate}")
+
+        obj_data = CacheEngine._get_computation_object_data(identifier_or_type)
+        identifier = obj_data.object_identifier
+        current_vars = set(obj_data.metadata.get_metadata_items())
+
+        # the rows of objects saved before the metadata changed are updated in the current relation,
+        # so they are copied into it first, which needs the relation to exist
+        DBManager.ensure_co_relation(obj_data)
+        start = time.perf_counter()
+        n_copied = 0
+        def on_copied(n: int):
+            nonlocal n_copied
+            n_copied += n
+            if on_batch is not None:
+                on_batch(0, 0, n)
+            if max_rate is not None:
+                delay = n_copied / max_rate - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+        DBManager.migrate_relations(identifier, batch_size, METADATA_MIGRATION_PAUSE, on_copied)
+        metadata_reps = DBManager.get_metadata_reps(identifier)
+
+        def get_missing_vars(metadata_hash: str) -> set[str]:
+            metadata_rep = metadata_reps.get(metadata_hash)
+            if metadata_rep is None:
+                return current_vars
+            return current_vars - ComputationObjectMetadata.string_representation_to_metadata_dict(metadata_rep).keys()
+
+        n_workers = 1 if workers == 1 else workers or os.cpu_count() or 1
+        executor = CacheEngine._new_process_pool(n_workers) if n_workers > 1 else None
+        start = time.perf_counter()
+        n_processed = 0
+        n_updated = 0
+        after_uid = None
+        try:
+            while stale := DBManager.get_stale_metadata_objects(obj_data, after_uid, batch_size):
+                after_uid = stale[-1][0]
+
+                # objects that only lost variables need no setters to run
+                rows = []
+                pairs = []
+                for uid, metadata_hash in stale:
+                    missing_vars = get_missing_vars(metadata_hash)
+                    if missing_vars:
+                        pairs.append(((identifier, uid), missing_vars))
+                    else:
+                        rows.append((uid, {}))
+
+                load_args = CacheEngine._get_load_args([pair for pair, _ in pairs])
+                items = [(uid, codec, missing_vars) for (_, uid, codec), (_, missing_vars) in zip(load_args, pairs)]
+                n_failed = 0
+                for uid, metadata, error in CacheEngine._compute_missing_metadata(identifier, items, executor, n_workers):
+                    if error is not None:
+                        print(f"Could not compute the metadata of {uid}: {error}")
+                        n_failed += 1
+                    else:
+                        rows.append((uid, metadata))
+
+                DBManager.update_computation_object_metadata(obj_data, rows)
+                n_updated += len(rows)
+                n_processed += len(stale)
+                if on_batch is not None:
+                    on_batch(len(rows), n_failed, 0)
+
+                if max_rate is not None:
+                    delay = n_processed / max_rate - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        return n_updated
+
+    @staticmethod
+    def _compute_missing_metadata(
+        identifier: str,
+        items: list[tuple[str, str, set[str]]],
+        executor: ProcessPoolExecutor | None,
+        n_workers: int,
+        ) -> list[tuple[str, dict | None, str | None]]:
+        """Computes the metadata of `(uid, codec, varnames)` items on `executor`, or in this process if it is None."""
+        if executor is None or len(items) <= 1:
+            return _compute_metadata_in_worker(identifier, items)
+        return list(CacheEngine._iter_chunk_results(executor, n_workers, items, _compute_metadata_in_worker, identifier))
+
+    @staticmethod
+    def _new_process_pool(n_workers: int) -> ProcessPoolExecutor:
+        """
+        Returns a process pool whose workers are set up by `_init_worker`, so that they
+        can load objects and perform computation functions without using the database.
+
+        Workers started with spawn or forkserver, the defaults on macOS and Windows, do
+        not inherit the registered computation objects and functions, so they import the
+        modules that define them. Types and functions must therefore be defined at module
+        level, and modules must not do work on import that only the main process should do.
+        """
+        modules = {cls.__module__ for cls in CacheEngine._computation_object_type_to_identifier_dict}
+        modules.update(func.__module__ for func, _, _ in CacheEngine._computation_function_pre_dict.values())
+        # the main module is imported by multiprocessing itself
+        modules.discard("__main__")
+
+        state = {
+            "modules": sorted(modules),
+            "obj_dir": CacheEngine._obj_dir,
+            "obj_layout": CacheEngine._obj_layout,
+            "prev_obj_layout": CacheEngine._prev_obj_layout,
+            "timings_enabled": Timings.is_enabled(),
+        }
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(state,))
+
+    @staticmethod
+    def _iter_chunk_results(
+        executor: ProcessPoolExecutor,
+        n_workers: int,
+        items: list,
+        func: Callable[..., list],
+        *args,
+        ) -> Iterator[Any]:
+        """
+        Calls `func(*args, chunk)` on `executor` for chunks of `items` and yields the elements
+        of the returned lists as the calls finish. Items are sent to the workers in chunks to
+        amortize the pickling overhead. Calls that have not started are cancelled if the
+        iteration stops early.
+        """
+        chunk_size = max(1, len(items) // (n_workers * PROCESS_CHUNKS_PER_WORKER))
+        futures = [executor.submit(func, *args, items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
 
     @staticmethod
     def start():
+        DBManager.load_relation_cache()
+        CacheEngine._create_computation_functions()
+        # the first usage records are flushed after an interval too, not right away
+        CacheEngine._usage_flushed_at = time.time()
+
+    @staticmethod
+    def _create_computation_functions():
         # populate the computation function dict
         for func_name, (func, inputs, output) in CacheEngine._computation_function_pre_dict.items():
             # get all inputs computation object datas
@@ -198,31 +1316,49 @@ class CacheEngine:
         return CacheEngine._computation_function_dict[func_name].inputs
         
     @staticmethod
-    def perform_computation_function(func_name: str, input_objects: list[any], normal_args: tuple | list):
-        comp_func = CacheEngine._computation_function_dict[func_name]
-
-        # if incorrect amount of arguments, throw an exception
-        if len(input_objects) != len(comp_func.inputs):
-            raise ValueError(f"Wrong amount of computation object inputs for function {func_name}; excpected {len(comp_func.inputs)} but got {len(input_objects)}!")
+    def _get_lineage_key(input_objects: list[Any], cast_normal_args: list[Any]) -> tuple[str, str] | None:
+        """
+        Returns the `(input_uids, normal_args)` strings used to look up
+        memoized results in the lineage table, or None if the call can not
+        be memoized.
 
-        # verify that the function was called with correct input arguments
-        for idx,inp_object in enumerate(input_objects):
-            obj_data = CacheEngine._get_computation_object_data(type(inp_object))
+        Inputs whose type uses the default `object.__hash__` are identified by
+        the uid they were saved or loaded under, since their hash is derived
+        from their address, which is reused once they are garbage collected.
+        Calls with such inputs that were neither saved nor loaded are not memoized.
+        Content identified inputs are identified by the uid they were saved or
+        loaded under too (see `get_co_hash`), and only digested if they were neither.
+        """
+        uids = []
+        for obj in input_objects:
+            obj_data = CacheEngine._get_computation_object_data(type(obj))
+            if CacheEngine._has_stable_uids(obj_data):
+                uids.append(CacheEngine.get_co_hash(obj))
+            else:
+                uid = CacheEngine._get_remembered_uid(obj)
+                if uid is None:
+                    return None
+                uids.append(uid)
+        input_uids = ",".join(uids)
+        normal_args = repr(tuple(cast_normal_args))
+        return input_uids, normal_args
 
-            # if the object datas are not the same, throw an exception
-            if obj_data != comp_func.inputs[idx]:
-                raise ValueError(f"Wrong input type for function {func_name}; excpected {comp_func.inputs[idx].object_identifier} but got {obj_data.object_identifier}!")
+    @staticmethod
+    def _has_stable_uids(obj_data: ComputationObjectData) -> bool:
+        """Returns False for types whose uid is the default `object.__hash__`, which is derived from the address of an object."""
+        return obj_data.identity != IDENTITY_HASH or obj_data.cls.__hash__ is not object.__hash__
 
-        # attempt casting the normal args
+    @staticmethod
+    def _cast_normal_args(comp_func: ComputationFunction, normal_args: tuple | list) -> list[Any]:
+        """Casts the normal args of a call to `comp_func` to the annotated types of its parameters."""
         cast_normal_args = []
-        
 
         # get the parameters after the computation object inputs to typecast them
-        normal_params = list(inspect.signature(comp_func.func).parameters.values())[len(input_objects):]
+        normal_params = list(inspect.signature(comp_func.func).parameters.values())[len(comp_func.inputs):]
 
         # check that passed normal args are the correct length
         if len(normal_args) != len(normal_params):
-            raise ValueError(f"Expected {len(normal_params)} normal arguments for the function {func_name} but was passed {len(normal_args)}")
+            raise ValueError(f"Expected {len(normal_params)} normal arguments for the function {comp_func.func_name} but was passed {len(normal_args)}")
 
         # attempt to cast the arguments
         for i,arg in enumerate(normal_args):
@@ -232,39 +1368,549 @@ class CacheEngine:
             except Exception as e:
                 raise TypeError(f"Could not cast {arg} as type {annotation}: {e}") from e
 
-        # call the function
-        result_obj = comp_func.func(*input_objects, *cast_normal_args)
+        return cast_normal_args
 
-        # check that the result is a computation object with correct type
+    @staticmethod
+    def _check_result_type(comp_func: ComputationFunction, result_obj: Any):
+        """Checks that the result of `comp_func` is a computation object with the correct type."""
         if comp_func.output is not Void:
             result_obj_data = CacheEngine._get_computation_object_data(type(result_obj))
             if result_obj_data != comp_func.output:
-                raise ValueError(f"The type of the result of the function {func_name} was incorrect; excpected {comp_func.output.object_identifier} but got {result_obj_data.object_identifier}!")
+                raise ValueError(f"The type of the result of the function {comp_func.func_name} was incorrect; excpected {comp_func.output.object_identifier} but got {result_obj_data.object_identifier}!")
+
+    @staticmethod
+    def perform_computation_function(
+        func_name: str,
+        input_objects: list[any],
+        normal_args: tuple | list,
+        recompute: bool = False,
+        profile: bool | ExecProfile = False,
+        trace_memory: bool = False,
+        return_uid: bool = False,
+        ):
+        """
+        Performs the computation function `func_name` and returns its result.
+        If `return_uid` is True, returns the result and the uid it is stored
+        under (None for functions without a computation object output, or if
+        the result could not be saved).
+
+        Results of functions with a computation object output are memoized:
+        the result is looked up in the lineage table by function name, input
+        uids and cast normal args. On a hit the cached result is loaded and the
+        function is not called. On a miss (or if `recompute` is True) the function
+        is called, and its result is saved and recorded in the lineage table.
+        Calls are only memoized if the uids of all inputs are stable, see
+        `_get_lineage_key`; the results of other calls are saved without
+        recording their lineage.
+
+        If `profile` is True, or an `ExecProfile` that already profiled loading the
+        inputs, the function is called even if a memoized result exists, and the call
+        and the save of the result are profiled with cProfile (and tracemalloc if
+        `trace_memory` is True). The profile is stored with the uid of the result,
+        see `get_profile`.
+        """
+        comp_func = CacheEngine._computation_function_dict[func_name]
+        if profile is True:
+            profile = ExecProfile(trace_memory)
+        elif profile is False:
+            profile = None
+        if profile is not None and comp_func.output is Void:
+            raise ValueError(f"Only functions with a computation object output can be profiled, since profiles are stored with the result; {func_name} has none")
+
+        # if incorrect amount of arguments, throw an exception
+        if len(input_objects) != len(comp_func.inputs):
+            raise ValueError(f"Wrong amount of computation object inputs for function {func_name}; excpected {len(comp_func.inputs)} but got {len(input_objects)}!")
+
+        # verify that the function was called with correct input arguments
+        for idx,inp_object in enumerate(input_objects):
+            obj_data = CacheEngine._get_computation_object_data(type(inp_object))
+
+            # if the object datas are not the same, throw an exception
+            if obj_data != comp_func.inputs[idx]:
+                raise ValueError(f"Wrong input type for function {func_name}; excpected {comp_func.inputs[idx].object_identifier} but got {obj_data.object_identifier}!")
+
+        cast_normal_args = CacheEngine._cast_normal_args(comp_func, normal_args)
+
+        # look for a memoized result
+        lineage_key = None
+        if comp_func.output is not Void:
+            lineage_key = CacheEngine._get_lineage_key(input_objects, cast_normal_args)
+        memoize = lineage_key is not None
+        if memoize:
+            input_uids, normal_args_rep = lineage_key
+        if memoize and not recompute and profile is None:
+            cached_uid = DBManager.get_lineage_result(func_name, input_uids, normal_args_rep)
+            if cached_uid is not None:
+                result_obj = CacheEngine.load_object(comp_func.output.object_identifier, cached_uid)
+                return (result_obj, cached_uid) if return_uid else result_obj
+
+        result_uid = None
+        try:
+            # call the function
+            with Timings.measure(CATEGORY_FUNCTION, func_name), CacheEngine._profile_phase(profile, PHASE_FUNCTION):
+                result_obj = comp_func.func(*input_objects, *cast_normal_args)
+            CacheEngine._check_result_type(comp_func, result_obj)
+
+            # save the result, and record its lineage if the call is memoized
+            if comp_func.output is not Void:
+                with CacheEngine._profile_phase(profile, PHASE_SAVE):
+                    # an existing object with the uid of a result without stable uids is another object
+                    result_uid = CacheEngine.save_object(result_obj, skip_existing=CacheEngine._has_stable_uids(comp_func.output))
+                    if memoize and result_uid is not None:
+                        DBManager.insert_lineage(func_name, input_uids, normal_args_rep, result_uid)
+        finally:
+            if profile is not None:
+                profile.finish()
+
+        if profile is not None and result_uid is not None:
+            DBManager.insert_profile(result_uid, func_name, profile.get_summary(), profile.get_stats_bytes())
+
+        return (result_obj, result_uid) if return_uid else result_obj
+
+    @staticmethod
+    def _profile_phase(profile: ExecProfile | None, phase: str):
+        return profile.phase(phase) if profile is not None else contextlib.nullcontext()
+
+    @staticmethod
+    def get_profile(uid: str) -> dict | None:
+        """
+        Returns the profile stored by `perform_computation_function` for the call that
+        resulted in `uid`, or None if there is none. `"summary"` holds the wall time and
+        memory per phase, and `"stats"` the cProfile data in the format of `pstats`
+        files, which `profiling.format_stats` lists as text.
+        """
+        row = DBManager.get_profile(uid)
+        return dict(row) if row is not None else None
 
-        return result_obj
+    @staticmethod
+    def get_map_inputs(input_uid_lists: list[list[str]], product: bool = False) -> list[tuple[str, ...]]:
+        """
+        Returns the input uid tuples `map_computation_function` performs a function
+        for. Lists are paired up element by element, or combined in every way if
+        `product` is True. When pairing up, lists of one element are repeated.
+        """
+        if product:
+            return list(itertools.product(*input_uid_lists))
+
+        lengths = {len(uids) for uids in input_uid_lists if len(uids) != 1}
+        if len(lengths) > 1:
+            raise ValueError(f"the input lists must have the same length to be paired up; had lengths {sorted(lengths)}")
+        n = lengths.pop() if lengths else 1
+        return list(zip(*(uids * n if len(uids) == 1 else uids for uids in input_uid_lists)))
+
+    @staticmethod
+    def map_computation_function(
+        func_name: str,
+        input_uid_lists: list[list[str]],
+        normal_args: tuple | list = (),
+        product: bool = False,
+        workers: int | None = None,
+        recompute: bool = False,
+        batch_size: int = BULK_SAVE_BATCH_SIZE,
+        ) -> list[str | None]:
+        """
+        Performs the computation function `func_name` for every input tuple of
+        `get_map_inputs(input_uid_lists, product)` on a process pool, and returns
+        the uids of the results in order.
+
+        `input_uid_lists` holds a list of stored object uids for each computation
+        object input of the function. The normal args are the same for every call.
+        Results are memoized like in `perform_computation_function`, and are
+        saved with `save_objects` in batches of `batch_size`. Calls that fail are
+        reported and get None as uid, as do all calls of functions without
+        computation object output.
+        """
+        result_uids = [None] * len(CacheEngine.get_map_inputs(input_uid_lists, product))
+        for idx, uid in CacheEngine.iter_map_computation_function(
+            func_name, input_uid_lists, normal_args, product, workers, recompute, batch_size
+            ):
+            result_uids[idx] = uid
+        return result_uids
+
+    @staticmethod
+    def iter_map_computation_function(
+        func_name: str,
+        input_uid_lists: list[list[str]],
+        normal_args: tuple | list = (),
+        product: bool = False,
+        workers: int | None = None,
+        recompute: bool = False,
+        batch_size: int = BULK_SAVE_BATCH_SIZE,
+        ) -> Iterator[tuple[int, str | None]]:
+        """
+        Performs a computation function like `map_computation_function`, but
+        yields `(index, result_uid)` tuples as the results are saved, where
+        `index` is the position of the input tuple in `get_map_inputs`.
+        Memoized results are yielded first. With `workers=1`, the function is
+        performed in this process.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1; was {batch_size}")
+
+        comp_func = CacheEngine._computation_function_dict[func_name]
+        if len(input_uid_lists) != len(comp_func.inputs):
+            raise ValueError(f"Wrong amount of computation object inputs for function {func_name}; excpected {len(comp_func.inputs)} but got {len(input_uid_lists)}!")
+        cast_normal_args = CacheEngine._cast_normal_args(comp_func, normal_args)
+
+        # verify that the inputs are stored objects of the correct types
+        for input_data, uids in zip(comp_func.inputs, input_uid_lists):
+            unique_uids = list(set(uids))
+            co_identifiers = DBManager.get_co_identifiers(unique_uids)
+            for uid in unique_uids:
+                if uid not in co_identifiers:
+                    raise ValueError(f"The input {uid} for function {func_name} is not a stored computation object!")
+                if co_identifiers[uid] != input_data.object_identifier:
+                    raise ValueError(f"Wrong input type for function {func_name}; excpected {input_data.object_identifier} but got {co_identifiers[uid]}!")
+
+        input_tuples = CacheEngine.get_map_inputs(input_uid_lists, product)
+        memoize = comp_func.output is not Void
+        normal_args_rep = repr(tuple(cast_normal_args))
+
+        # yield the memoized results
+        todo = list(range(len(input_tuples)))
+        if memoize and not recompute:
+            memoized = DBManager.get_lineage_results(func_name, [",".join(t) for t in input_tuples], normal_args_rep)
+            todo = []
+            for idx, input_uids in enumerate(input_tuples):
+                result_uid = memoized.get(",".join(input_uids))
+                if result_uid is None:
+                    todo.append(idx)
+                else:
+                    yield idx, result_uid
+
+        if not todo:
+            return
+
+        # resolve the load arguments of each distinct input once
+        pairs = list({
+            (input_data.object_identifier, uid): None
+            for idx in todo
+            for input_data, uid in zip(comp_func.inputs, input_tuples[idx])
+        })
+        load_args = dict(zip(pairs, CacheEngine._get_load_args(pairs)))
+        items = [
+            (idx, [load_args[(input_data.object_identifier, uid)] for input_data, uid in zip(comp_func.inputs, input_tuples[idx])])
+            for idx in todo
+        ]
+
+        # an existing object with the uid of a result without stable uids is another object
+        skip_existing = CacheEngine._has_stable_uids(comp_func.output)
+
+        def save_batch(batch: list[tuple[int, Any]]) -> Iterator[tuple[int, str | None]]:
+            # commit the results and their lineage together
+            with DBManager.transaction():
+                uids = CacheEngine.save_objects([obj for _, obj in batch], batch_size, skip_existing=skip_existing)
+                DBManager.insert_lineages(func_name, [
+                    (",".join(input_tuples[idx]), normal_args_rep, uid)
+                    for (idx, _), uid in zip(batch, uids)
+                    if uid is not None
+                ])
+            yield from ((idx, uid) for (idx, _), uid in zip(batch, uids))
+
+        batch = []
+        for idx, result_obj, error, seconds in CacheEngine._iter_perform_items(func_name, cast_normal_args, items, workers):
+            # the calls are timed where they run, which may be a worker process
+            if seconds is not None:
+                Timings.record(CATEGORY_FUNCTION, func_name, seconds)
+            if error is not None:
+                print(f"Could not perform {func_name} on the inputs {', '.join(input_tuples[idx])}: {error}")
+                yield idx, None
+            elif not memoize:
+                yield idx, None
+            else:
+                batch.append((idx, result_obj))
+                if len(batch) >= batch_size:
+                    yield from save_batch(batch)
+                    batch = []
+        if batch:
+            yield from save_batch(batch)
+
+    @staticmethod
+    def configure_async(
+        max_workers: int | None = None,
+        type_limit: int | None = None,
+        type_limits: dict[str | type, int] | None = None,
+        ):
+        """
+        Configures the async methods (`asave_object`, `aload_object`, `aload_objects`
+        and `aperform`). Call it before they are used, or while none are running.
+
+        :param max_workers: The number of threads running the file and database
+            work of the async methods. Defaults to the current number, initially 32.
+        :param type_limit: How many async operations on objects of one type can
+            run at once. Defaults to the current limit, initially 8.
+        :param type_limits: Limits for specific computation object types or
+            identifiers, overriding `type_limit`.
+        """
+        if max_workers is not None:
+            if max_workers < 1:
+                raise ValueError(f"max_workers must be at least 1; was {max_workers}")
+            CacheEngine._async_max_workers = max_workers
+            if CacheEngine._async_executor is not None:
+                CacheEngine._async_executor.shutdown(wait=False)
+                CacheEngine._async_executor = None
+
+        if type_limit is not None:
+            if type_limit < 1:
+                raise ValueError(f"type_limit must be at least 1; was {type_limit}")
+            CacheEngine._async_type_limit = type_limit
+
+        if type_limits is not None:
+            for identifier_or_type, limit in type_limits.items():
+                if limit < 1:
+                    raise ValueError(f"type limits must be at least 1; was {limit} for {identifier_or_type}")
+                identifier = CacheEngine._get_computation_object_data(identifier_or_type).object_identifier
+                CacheEngine._async_type_limits[identifier] = limit
+
+        CacheEngine._async_semaphores = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    async def _run_async(identifier: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs the blocking `func` on the async executor without blocking the event
+        loop, waiting first if the concurrency limit of `identifier` is reached.
+        """
+        # asyncio is imported here, since importing it takes longer than the rest of the engine,
+        # and it is already imported when a coroutine runs
+        import asyncio
+        loop = asyncio.get_running_loop()
+        semaphores = CacheEngine._async_semaphores.setdefault(loop, {})
+        semaphore = semaphores.get(identifier)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(CacheEngine._async_type_limits.get(identifier, CacheEngine._async_type_limit))
+            semaphores[identifier] = semaphore
+
+        async with semaphore:
+            return await loop.run_in_executor(CacheEngine._get_async_executor(), functools.partial(func, *args, **kwargs))
+
+    @staticmethod
+    def _get_async_executor() -> ThreadPoolExecutor:
+        if CacheEngine._async_executor is None:
+            CacheEngine._async_executor = ThreadPoolExecutor(
+                max_workers=CacheEngine._async_max_workers,
+                thread_name_prefix="ccache-async",
+                )
+        return CacheEngine._async_executor
+
+    @staticmethod
+    async def asave_object(obj: Any, skip_existing: bool = False) -> str | None:
+        """Saves a computation object like `save_object`, without blocking the event loop."""
+        identifier = CacheEngine._get_computation_object_data(type(obj)).object_identifier
+        return await CacheEngine._run_async(identifier, CacheEngine.save_object, obj, skip_existing)
+
+    @staticmethod
+    async def aload_object(identifier_or_type: str | type, uid: str, use_cache: bool = True, codec: str | None = None) -> Any:
+        """Loads a computation object like `load_object`, without blocking the event loop."""
+        obj_data = CacheEngine._get_computation_object_data(identifier_or_type)
+        if use_cache:
+            # cached objects are returned right away, without a round trip through the executor
+            cached_obj = CacheEngine._object_cache.get(uid, obj_data.cls)
+            if cached_obj is not None:
+                CacheEngine._record_usage(uid)
+                return cached_obj
+
+        return await CacheEngine._run_async(
+            obj_data.object_identifier, CacheEngine.load_object, obj_data.object_identifier, uid, use_cache, codec
+            )
+
+    @staticmethod
+    async def aload_objects(pairs: Iterable[tuple[str | type, str]], use_cache: bool = True) -> list[Any]:
+        """
+        Loads many computation objects concurrently like `load_objects`, without
+        blocking the event loop, and returns them in order. The codecs of the
+        payloads are looked up in one query up front.
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return []
 
-def check_saveload_func_signature(func):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        load_args = await loop.run_in_executor(CacheEngine._get_async_executor(), CacheEngine._get_load_args, pairs)
+        return await asyncio.gather(*(
+            CacheEngine.aload_object(identifier, uid, use_cache, codec)
+            for identifier, uid, codec in load_args
+        ))
+
+    @staticmethod
+    async def aperform(
+        func_name: str,
+        input_objects: list[Any],
+        normal_args: tuple | list = (),
+        recompute: bool = False,
+        ) -> Any:
+        """
+        Performs a computation function like `perform_computation_function`, without
+        blocking the event loop. The function runs on a thread of the async executor,
+        so CPU-bound functions that hold the GIL still slow down the loop's thread;
+        use `map_computation_function` for those.
+        """
+        comp_func = CacheEngine._computation_function_dict[func_name]
+        identifier = func_name if comp_func.output is Void else comp_func.output.object_identifier
+        return await CacheEngine._run_async(
+            identifier, CacheEngine.perform_computation_function, func_name, input_objects, normal_args, recompute
+            )
+
+    @staticmethod
+    def _iter_perform_items(
+        func_name: str,
+        cast_normal_args: list[Any],
+        items: list[tuple[int, list[tuple[str, str, str]]]],
+        workers: int | None,
+        ) -> Iterator[tuple[int, Any, str | None, float | None]]:
+        """
+        Performs `func_name` for `(index, input load args)` items, on a process pool
+        unless `workers` is 1. Yields `(index, result, error, seconds)` tuples as the
+        calls finish, where `error` describes the exception of a failed call and
+        `seconds` is the duration of a timed call.
+        """
+        if workers == 1 or len(items) <= 1:
+            for item in items:
+                yield from _perform_items_in_worker(func_name, cast_normal_args, True, [item])
+            return
+
+        n_workers = workers or os.cpu_count() or 1
+        with CacheEngine._new_process_pool(n_workers) as executor:
+            yield from CacheEngine._iter_chunk_results(
+                executor, n_workers, items, _perform_items_in_worker, func_name, cast_normal_args, False
+                )
+
+def _init_worker(state: dict):
+    """Sets up a worker of `CacheEngine._new_process_pool` with the state of the engine in the main process."""
+    for module in state["modules"]:
+        importlib.import_module(module)
+    CacheEngine._create_computation_functions()
+
+    # the modules may open the store on import, but workers do not use the database
+    CacheEngine._usage_pid = None
+    CacheEngine._obj_dir = state["obj_dir"]
+    CacheEngine._obj_layout = state["obj_layout"]
+    CacheEngine._prev_obj_layout = state["prev_obj_layout"]
+    Timings.configure(enabled=state["timings_enabled"])
+
+def _perform_items_in_worker(
+    func_name: str,
+    cast_normal_args: list[Any],
+    use_cache: bool,
+    items: list[tuple[int, list[tuple[str, str, str]]]],
+    ) -> list[tuple[int, Any, str | None, float | None]]:
+    """
+    Performs `func_name` for the items of `CacheEngine._iter_perform_items`. Returns
+    `(index, result, error, seconds)` tuples, where `seconds` is the duration of the
+    call if it was timed.
+    """
+    comp_func = CacheEngine._computation_function_dict[func_name]
+    timed = Timings.is_enabled()
+    results = []
+    for idx, load_args in items:
+        try:
+            input_objects = [
+                CacheEngine.load_object(identifier, uid, use_cache=use_cache, codec=codec)
+                for identifier, uid, codec in load_args
+            ]
+            start = time.perf_counter()
+            result_obj = comp_func.func(*input_objects, *cast_normal_args)
+            seconds = time.perf_counter() - start if timed else None
+            CacheEngine._check_result_type(comp_func, result_obj)
+            results.append((idx, result_obj, None, seconds))
+        except Exception as e:
+            results.append((idx, None, f"{type(e).__name__}: {e}", None))
+    return results
+
+def _load_objects_in_worker(items: list[tuple[int, str, str, str]]) -> list[tuple[int, Any, int]]:
+    """
+    Loads `(index, identifier, uid, codec)` items for `CacheEngine.iter_load_objects`.
+    Returns `(index, obj, payload size)` tuples.
+    """
+    return [
+        (idx, *CacheEngine._load_payload(CacheEngine._get_computation_object_data(identifier), uid, codec))
+        for idx, identifier, uid, codec in items
+    ]
+
+def _compute_metadata_in_worker(
+    identifier: str,
+    items: list[tuple[str, str, set[str]]],
+    ) -> list[tuple[str, dict | None, str | None]]:
+    """
+    Loads the objects of `(uid, codec, varnames)` items and computes the given metadata
+    variables for `CacheEngine.backfill_metadata`. Returns `(uid, metadata, error)` tuples.
+    """
+    obj_data = CacheEngine._get_computation_object_data(identifier)
+    results = []
+    for uid, codec, varnames in items:
+        try:
+            # loaded objects are not cached, since a backfill touches every object once
+            obj = CacheEngine.load_object(identifier, uid, use_cache=False, codec=codec)
+            metadata = obj_data.metadata.compute_metadata(obj, only_varnames=varnames)
+            results.append((uid, {var: val for var, val in metadata.items() if var in varnames}, None))
+        except Exception as e:
+            results.append((uid, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def check_saveload_func_signature(func, returns_buffer: bool = False):
     # verify that the method signature is correct
     sig = inspect.signature(func)
     params = list(sig.parameters.values())
 
-    if not len(params) in (1,2):
+    # buffer save methods take no path, bound methods take no self
+    if returns_buffer:
+        if not len(params) in (0,1):
+            raise TypeError(f"A @save_method(buffer=True) requires signature of type (self); got {sig}")
+    elif not len(params) in (1,2):
         raise TypeError(f"A @save_method requires signature of type (self, path: str); got {sig}")
 
-def save_method(func):
-    # verify that the method signature is correct
-    check_saveload_func_signature(func)
-    
-    # flag that the method is a save method
-    setattr(func, IS_SAVE_METHOD_FLAG, True)
-    return func
+def save_method(func = None, *, buffer: bool = False):
+    """
+    Marks the method saving a computation object. By default the method has
+    the signature `(self, path: str)` and writes the object to `path`.
 
-def load_method(func):
-    # verify that the method signature is correct
-    check_saveload_func_signature(func)
+    With `buffer=True` the method has the signature `(self)` and returns a
+    C-contiguous bytes-like object, e.g. `bytes` or a NumPy array, which the
+    engine writes to the store.
+    """
+    def wrapper(func):
+        # verify that the method signature is correct
+        check_saveload_func_signature(func, buffer)
+
+        # flag that the method is a save method
+        setattr(func, IS_SAVE_METHOD_FLAG, True)
+        setattr(func, IS_BUFFER_METHOD_FLAG, buffer)
+        return func
+
+    if func is None:
+        return wrapper
+    return wrapper(func)
 
-    # flag that the method is a save method
-    setattr(func, IS_LOAD_METHOD_FLAG, True)
+def load_method(func = None, *, buffer: bool = False):
+    """
+    Marks the method loading a computation object. By default the method has
+    the signature `(self, path: str)` and reads the object from `path`.
+
+    With `buffer=True` the method has the signature `(self, buf: memoryview)`
+    and reads the object from a read-only memoryview of the payload. The view
+    is backed by a memory map of the file, so e.g. `numpy.frombuffer(buf)`
+    does not copy the payload. The map stays open while views of it are alive.
+    """
+    def wrapper(func):
+        # verify that the method signature is correct
+        check_saveload_func_signature(func)
+
+        # flag that the method is a load method
+        setattr(func, IS_LOAD_METHOD_FLAG, True)
+        setattr(func, IS_BUFFER_METHOD_FLAG, buffer)
+        return func
+
+    if func is None:
+        return wrapper
+    return wrapper(func)
+
+def identity_key(func):
+    """
+    Marks the method returning the identity key of a computation object
+    registered with `identity="key"`. The method takes only `self` and
+    returns a str or bytes value; objects with equal keys get equal uids.
+    """
+    setattr(func, IS_IDENTITY_KEY_FLAG, True)
     return func
 
 def metadata_setter(vals: tuple[str]):    
@@ -275,7 +1921,9 @@ def metadata_setter(vals: tuple[str]):
 
 def computation_object(
         identifier: str,
-        metadata: ComputationObjectMetadata = ComputationObjectMetadata()
+        metadata: ComputationObjectMetadata = ComputationObjectMetadata(),
+        identity: str = IDENTITY_HASH,
+        codec: str = codecs.CODEC_NONE,
         ):
     """
     Decorator method to mark a class as a Computation Object.
@@ -298,13 +1946,24 @@ def computation_object(
     :type identifier: str
     :param metadata: The metadata assosciated with this object.
     :type metadata: ComputationObjectMetadata
+    :param identity: How uids are derived for this object. `"hash"` uses `__hash__`,
+        `"content"` a digest of the saved bytes and `"key"` a digest of the value
+        returned by the `@identity_key` method. Only `"content"` and `"key"` are
+        stable across processes.
+    :type identity: str
+    :param codec: The codec to compress payloads with: `"none"`, `"zlib"`, `"lzma"`
+        or `"bz2"`. The codec of each payload is stored, so changing it does not
+        affect loading payloads written earlier.
+    :type codec: str
     """
 
     def class_wrapper(c):
         obj_data = CacheEngine._register_computation_object(
             cls=c, 
             identifier=identifier, 
-            metadata=metadata)
+            metadata=metadata,
+            identity=identity,
+            codec=codec)
         
         for name, member in vars(c).items():
             # Check if save and load methods have been defined and set them
@@ -313,17 +1972,24 @@ def computation_object(
                     c, lambda dat, 
                     save_method_name=name : setattr(dat, SAVE_METHOD_NAME, save_method_name)
                     )
+                obj_data.save_buffer = getattr(member, IS_BUFFER_METHOD_FLAG, False)
             elif getattr(member, IS_LOAD_METHOD_FLAG, False):
                 CacheEngine._modify_computation_object_data(
                     c, lambda dat, 
                     load_method_name=name : setattr(dat, LOAD_METHOD_NAME, load_method_name)
                     )
+                obj_data.load_buffer = getattr(member, IS_BUFFER_METHOD_FLAG, False)
+            elif getattr(member, IS_IDENTITY_KEY_FLAG, False):
+                obj_data.identity_key_method = name
 
             # add metadata functions
             metadata_tuple = getattr(member, METADATA_TUPLE_NAME, None)
             if metadata_tuple is not None:
                 obj_data.metadata.add_metadata_function(name, metadata_tuple)
 
+        if identity == IDENTITY_KEY and obj_data.identity_key_method is None:
+            raise ValueError(f"the computation object {identifier} uses key identity but has no @identity_key method!")
+
         return c
     
     return class_wrapper
@@ -1,6 +1,16 @@
 from dataclasses import dataclass, field
 
 from .computation_object_metadata import ComputationObjectMetadata
+from .payload_codecs import CODEC_NONE
+
+IDENTITY_HASH = "hash"
+"""Identify objects by the built-in `hash()` of the object."""
+IDENTITY_CONTENT = "content"
+"""Identify objects by a digest of the bytes written by their save method."""
+IDENTITY_KEY = "key"
+"""Identify objects by a digest of the value returned by their `@identity_key` method."""
+
+IDENTITY_MODES = (IDENTITY_HASH, IDENTITY_CONTENT, IDENTITY_KEY)
 
 
 @dataclass
@@ -11,4 +21,14 @@ class ComputationObjectData:
     save_method: str = None
     """Name of the method to save the object"""
     load_method: str = None
-    """Name of the method to load the object"""
\ No newline at end of file
+    """Name of the method to load the object"""
+    save_buffer: bool = False
+    """If the save method returns a bytes-like object instead of writing to a path"""
+    load_buffer: bool = False
+    """If the load method takes a read-only memoryview of the payload instead of a path"""
+    identity: str = IDENTITY_HASH
+    """How uids are derived for objects of this type. One of `IDENTITY_MODES`."""
+    identity_key_method: str = None
+    """Name of the method returning the identity key, used if `identity` is `IDENTITY_KEY`"""
+    codec: str = CODEC_NONE
+    """The compression codec new payloads of this type are written with. One of `payload_codecs.CODECS`."""
@@ -1,4 +1,5 @@
 from . import sqltypes as st
+from .timings import Timings, CATEGORY_METADATA
 
 class ComputationObjectMetadata():
     def __init__(self, **kwargs):
@@ -8,6 +9,9 @@ class ComputationObjectMetadata():
         """A dict containing function names as keys,
         and tuples of the names of the values they 
         return as values."""
+
+        self._indexes: list[tuple[str, ...]] = []
+        """The columns of each index declared on the metadata, in order."""
         
         for varname, typename in kwargs.items():
             if not st.typename_islegal(typename):
@@ -16,6 +20,27 @@ class ComputationObjectMetadata():
 
     def get_metadata_items(self):
         return self._metadata_items
+
+    def add_index(self, *varnames: str) -> "ComputationObjectMetadata":
+        """
+        Declares an index on the given metadata variables, e.g. `add_index("a")`
+        or `add_index("a", "b")` for a composite index. Returns the metadata so
+        that calls can be chained. Indexes are created on every relation version
+        of the computation object.
+        """
+        if not varnames:
+            raise ValueError("an index needs at least one variable")
+
+        for var in varnames:
+            if not var in self._metadata_items:
+                raise KeyError(f"The variable {var} did not exist on the Computation Object!")
+
+        if varnames not in self._indexes:
+            self._indexes.append(varnames)
+        return self
+
+    def get_indexes(self) -> list[tuple[str, ...]]:
+        return self._indexes
     
     def get_string_representation(self) -> str:
         parts = [f"{k}:{v}" for k, v in sorted(self._metadata_items.items())]
@@ -36,16 +61,24 @@ class ComputationObjectMetadata():
         # add them
         self._metadata_functions[funcname] = varnames
 
-    def compute_metadata(self, obj) -> dict:
+    def compute_metadata(self, obj, only_varnames: set[str] | None = None) -> dict:
+        """
+        Runs the metadata setters on `obj` and returns the values by variable name.
+        If `only_varnames` is given, only the setters returning one of them are run.
+        """
 
         vars = {}
 
         for funcname, varnames in self._metadata_functions.items():
+            if only_varnames is not None and only_varnames.isdisjoint(varnames):
+                continue
+
             metadata_func = getattr(obj, funcname, None)
             if metadata_func is None:
                 raise NameError(f"The object of type {type(obj)} did not have a function with the name {funcname}!")
 
-            vals = metadata_func() # compute the metadata
+            with Timings.measure(CATEGORY_METADATA, f"{type(obj).__name__}.{funcname}"):
+                vals = metadata_func() # compute the metadata
             for var, val in zip(varnames, vals, strict = True):
                 vars[var] = val
 
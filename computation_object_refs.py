@@ -5,43 +5,94 @@ from dataclasses import dataclass
 VARTYPE_SINGLE = 1
 VARTYPE_LIST = 2
 
+class ComputationObjectHandle:
+    """
+    A lazy reference to a stored computation object. Holds only the uid and
+    the computation object data; the object is loaded through the object cache
+    of `CacheEngine.load_object` when `get` is called. Handles created with
+    `from_object` keep their object alive.
+    """
+    __slots__ = ("uid", "co_data", "_obj")
+
+    def __init__(self, uid: str, co_data: ComputationObjectData, obj: Any = None):
+        self.uid = uid
+        self.co_data = co_data
+        self._obj = obj
+
+    @staticmethod
+    def from_object(obj: Any) -> "ComputationObjectHandle":
+        """Returns a handle to an already loaded computation object."""
+        co_data = CacheEngine._get_computation_object_data(type(obj))
+        return ComputationObjectHandle(CacheEngine.get_co_hash(obj), co_data, obj)
+
+    def is_loaded(self) -> bool:
+        return self._obj is not None or self.uid in CacheEngine._object_cache
+
+    def get(self) -> Any:
+        """Returns the computation object, loading it if it is not in memory."""
+        if self._obj is not None:
+            return self._obj
+        return CacheEngine.load_object(self.co_data.object_identifier, self.uid)
+
 @dataclass
 class ComputationObjectReference:
     varname: str
     vartype: int
-    data: Any
+    data: ComputationObjectHandle | list[ComputationObjectHandle]
     co_data: ComputationObjectData
 
+    def get_handles(self) -> list[ComputationObjectHandle]:
+        if self.vartype == VARTYPE_LIST:
+            return self.data
+        return [self.data]
+
+    def get_uids(self) -> list[str]:
+        return [handle.uid for handle in self.get_handles()]
+
 class CoVars:
-    co_ref_dict: dict[str, ComputationObjectReference | list[ComputationObjectMetadata]] = {}
-    uid_objs_dict: dict[str, Any] = {}
+    co_ref_dict: dict[str, ComputationObjectReference] = {}
+    uid_handles_dict: dict[str, ComputationObjectHandle] = {}
+
+    @staticmethod
+    def _to_handle(obj: Any) -> ComputationObjectHandle:
+        if isinstance(obj, ComputationObjectHandle):
+            return obj
+        return ComputationObjectHandle.from_object(obj)
 
     @staticmethod
     def add_co_ref(varname: str, obj: Any) -> None:
+        """
+        Stores a named reference to a computation object, a handle to one,
+        or a list of either.
+        """
 
         CoVars.rm_co_ref(varname) # remove old reference if it exists, to avoid stale references and memory leaks
 
         # get the co_data based on the 
-        co_data = None
-        vartype = -1
         if (isinstance(obj, list)):
-            co_data = CacheEngine._get_computation_object_data(type(obj[0]))
+            data = [CoVars._to_handle(o) for o in obj]
+            co_data = data[0].co_data
             vartype = VARTYPE_LIST
         else:
-            co_data = CacheEngine._get_computation_object_data(type(obj))
+            data = CoVars._to_handle(obj)
+            co_data = data.co_data
             vartype = VARTYPE_SINGLE
 
-        co_ref = ComputationObjectReference(varname, vartype, obj, co_data)
+        co_ref = ComputationObjectReference(varname, vartype, data, co_data)
         CoVars.co_ref_dict[varname] = co_ref
 
-        # also store references to the objects with uids as keys for fast retrieval
-        if vartype == VARTYPE_SINGLE:
-            uid = CacheEngine.get_co_hash(obj)
-            CoVars.uid_objs_dict[uid] = obj
-        elif vartype == VARTYPE_LIST:
-            for o in obj:
-                uid = CacheEngine.get_co_hash(o)
-                CoVars.uid_objs_dict[uid] = o
+        # also store the handles with uids as keys for fast retrieval
+        for handle in co_ref.get_handles():
+            CoVars.uid_handles_dict[handle.uid] = handle
+
+    @staticmethod
+    def add_co_ref_uids(varname: str, co_data: ComputationObjectData, uids: list[str]) -> None:
+        """
+        Stores a named reference to stored computation objects without loading them.
+        A single uid is stored as a single variable, several as a list variable.
+        """
+        handles = [ComputationObjectHandle(uid, co_data) for uid in uids]
+        CoVars.add_co_ref(varname, handles[0] if len(handles) == 1 else handles)
         
     @staticmethod
     def get_co_ref(varname: str) -> ComputationObjectReference | None:
@@ -58,30 +109,36 @@ class CoVars:
         """
         if varname in CoVars.co_ref_dict:
             ref = CoVars.co_ref_dict[varname]
-            if ref.vartype == VARTYPE_SINGLE:
-                uid = CacheEngine.get_co_hash(ref.data)
-                if uid in CoVars.uid_objs_dict:
-                    del CoVars.uid_objs_dict[uid]
-            elif ref.vartype == VARTYPE_LIST:
-                for o in ref.data:
-                    uid = CacheEngine.get_co_hash(o)
-                    if uid in CoVars.uid_objs_dict:
-                        del CoVars.uid_objs_dict[uid]
+            for uid in ref.get_uids():
+                if uid in CoVars.uid_handles_dict:
+                    del CoVars.uid_handles_dict[uid]
             del CoVars.co_ref_dict[varname]
             
     @staticmethod
     def get_metadata_list_from_ref(ref: ComputationObjectReference):
-        if ref.vartype == VARTYPE_LIST:
-            return CacheEngine.get_metadatas_for_computation_objects(ref.data)
-        elif ref.vartype == VARTYPE_SINGLE:
-            return CacheEngine.get_metadatas_for_computation_objects([ref.data])
+        """Returns the stored metadata rows of the objects a reference points to."""
+        return DBManager.get_rows_for_obj_uids(ref.get_uids(), ref.co_data)
+
+    @staticmethod
+    def iter_load_ref(ref: ComputationObjectReference, workers: int | None = None) -> Iterator[int]:
+        """
+        Loads the objects a reference points to into the object cache, in parallel
+        with `CacheEngine.iter_load_objects`. Objects that are already in memory
+        are skipped. Yields the number of objects loaded so far after each load.
+        """
+        handles = [handle for handle in ref.get_handles() if not handle.is_loaded()]
+        pairs = [(handle.co_data.object_identifier, handle.uid) for handle in handles]
+        for n_loaded, _ in enumerate(CacheEngine.iter_load_objects(pairs, workers), 1):
+            yield n_loaded
 
     @staticmethod
     def get_obj_from_uid(uid: str) -> Any | None:
         """
         Returns the computation object with the given uid, or None if it does not exist.
+        The object is loaded if it has not been loaded before.
         """
-        if not uid in CoVars.uid_objs_dict:
+        if not uid in CoVars.uid_handles_dict:
             return None
         
-        return CoVars.uid_objs_dict[uid]
\ No newline at end of file
+        return CoVars.uid_handles_dict[uid].get()
+
@@ -0,0 +1,80 @@
+import sqlite3 as sql
+import threading
+from typing import Callable
+import uuid
+
+MEMORY_DB_PATHS = (":memory", ":memory:")
+
+
+class ThreadConnections:
+    """
+    Hands every thread its own connection to one SQLite database, since a
+    `sqlite3.Connection` can only be used by the thread that created it.
+
+    Connections are opened on first use in a thread and set up with `setup`,
+    e.g. to set pragmas. Connections of threads that have exited are closed
+    when the next connection is opened. An in-memory database is shared by
+    all threads through SQLite's shared cache.
+    """
+
+    def __init__(self, db_path: str, setup: Callable[[sql.Connection], None] | None = None):
+        self.db_path = db_path
+        self._setup = setup
+        self._uri = False
+        self._memory_keeper = None
+        if db_path in MEMORY_DB_PATHS:
+            # a named shared-cache database lives as long as one connection to it is open
+            self.db_path = f"file:ccache-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+            self._memory_keeper = self._connect()
+
+        self.local = threading.local()
+        """Thread-local namespace of the connections, also for state that belongs to a connection."""
+        self._lock = threading.Lock()
+        self._conns: dict[int, tuple[threading.Thread, sql.Connection]] = {}
+        """Thread ident -> (thread, connection) of every open connection."""
+        self._closed = False
+
+    def _connect(self) -> sql.Connection:
+        # connections are only used by their own thread, but may be closed by another one
+        conn = sql.connect(self.db_path, uri=self._uri, check_same_thread=False)
+        conn.row_factory = sql.Row
+        return conn
+
+    def get(self) -> sql.Connection:
+        """Returns the connection of the calling thread, opening it if necessary."""
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            return conn
+
+        if self._closed:
+            raise RuntimeError("the connections have been closed")
+
+        conn = self._connect()
+        if self._setup is not None:
+            self._setup(conn)
+        self.local.conn = conn
+
+        thread = threading.current_thread()
+        with self._lock:
+            for ident, (other_thread, other_conn) in list(self._conns.items()):
+                if not other_thread.is_alive():
+                    other_conn.close()
+                    del self._conns[ident]
+            self._conns[thread.ident] = (thread, conn)
+        return conn
+
+    def close(self):
+        """Closes the connections of all threads. Call it when no thread uses them anymore."""
+        with self._lock:
+            self._closed = True
+            for _, conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+        if self._memory_keeper is not None:
+            self._memory_keeper.close()
+            self._memory_keeper = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._conns)
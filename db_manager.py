@@ -1,45 +1,136 @@
 import sqlite3 as sql
 import os
+import random
 import re
 import hashlib
-from typing import Optional
+import itertools
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
 import uuid
+import weakref
 
 from .computation_object_data import ComputationObjectData
 from .computation_object_metadata import ComputationObjectMetadata
+from .db_connections import MEMORY_DB_PATHS, ThreadConnections
+from .timings import Timings, CATEGORY_DB
 
 
 # Some copilot help
 
 COMPUTATION_OBJECT_RELATION_PREFIX = "co_"
+SQLITE_MAX_VARIABLES = 999
+"""The lowest limit on bound parameters per statement across SQLite versions."""
+UID_TEMP_TABLE_THRESHOLD = 100_000
+"""From how many uids on `iter_rows_for_obj_uids` joins a temporary table of
+the uids instead of binding them in chunks. Below it, the chunked statements
+are at least as fast, since they skip filling the table."""
+UID_TEMP_TABLE_PREFIX = "ccache_uids_"
+"""The name prefix of those temporary tables."""
 
-class DBManager:
+QUERY_FETCH_BATCH_SIZE = 1000
+"""How many rows the streaming query methods fetch from SQLite at a time."""
 
-    conn: Optional[sql.Connection] = None
+MIGRATION_BATCH_SIZE = 10_000
+"""How many rows a metadata migration copies per write transaction."""
+
+BUSY_TIMEOUT_MS = 5000
+"""How long a connection in concurrent mode waits for a lock before failing."""
+WRITE_RETRIES = 5
+WRITE_RETRY_BASE_DELAY = 0.05
+"""Delay in seconds before the first retry of a locked write. Doubles per retry."""
+
+T = TypeVar("T")
+
+class _DBManagerType(type):
+
+    @property
+    def conn(cls) -> Optional[sql.Connection]:
+        """The connection of the calling thread, or None if `initialize` has not been called."""
+        if cls._connections is None:
+            return None
+        return cls._connections.get()
+
+
+class DBManager(metaclass=_DBManagerType):
+
+    _connections: ThreadConnections | None = None
+    """The connections of the threads using the database. `DBManager.conn` is
+    the connection of the calling thread, so that the static methods can be
+    called from any thread."""
+
+    _relation_cache: dict[str, tuple[str, str]] = {}
+    """Maps co_identifier to the name and metadata hash of its most recent
+    relation. Filled by `load_relation_cache` and kept up to date by
+    `_create_co_relation`."""
+
+    _relation_cache_generation: int = 0
+    """Incremented when `_relation_cache` may hold relations of a rolled back
+    transaction, so that every thread reloads it."""
+
+    _metadata_hash_cache: dict[str, str] = {}
+    """Maps co_identifier to the hash of its registered metadata."""
+
+    _indexed_relations: set[str] = set()
+    """Relations whose declared metadata indexes have been synced in this process."""
+
+    _migrating_relations: set[str] = set()
+    """Relations that rows of older relations are still being copied into. They
+    are read through their migration view. Filled by `load_relation_cache`."""
+
+    _uid_tables_in_use: set[str] = set()
+    """Temporary uid tables of `_iter_rows_with_uid_table` whose iterators are alive."""
 
     @staticmethod
-    def initialize(db_path: str):
+    def initialize(db_path: str, concurrent: bool = False, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
         """Create (or open) a SQLite database at ``db_path`` and initialize
         a minimal schema used by the cache.
 
         - Creates parent directories if necessary (except for ``":memory:"``).
         - Enables foreign key support.
         - Creates a simple ``ccache_meta`` table to store metadata like version.
-
-        Returns the open :class:`sqlite3.Connection`.
+        - If ``concurrent`` is True, switches the database to WAL journaling so
+          that several processes can use it at once. Readers then never block
+          writers, and writers wait up to ``busy_timeout_ms`` for each other.
+          The journal mode is stored in the database file, so it stays in WAL
+          mode for connections opened without ``concurrent`` as well.
         """
         # Ensure the parent directory exists unless using in-memory DB
-        if db_path not in (":memory", ":memory:"):
+        if db_path not in MEMORY_DB_PATHS:
             parent = os.path.dirname(db_path)
             if parent:
                 os.makedirs(parent, exist_ok=True)
 
-        conn = sql.connect(db_path)
-        # Prefer row factory for convenience when reading metadata
-        conn.row_factory = sql.Row
+        def setup(conn: sql.Connection):
+            # Enable common pragmas
+            conn.execute("PRAGMA foreign_keys = ON;")
+            if concurrent:
+                conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)};")
+                # in WAL mode, NORMAL only syncs at checkpoints and is still safe against corruption
+                conn.execute("PRAGMA synchronous = NORMAL;")
 
-        # Enable common pragmas
-        conn.execute("PRAGMA foreign_keys = ON;")
+        DBManager.close()
+        DBManager._connections = ThreadConnections(db_path, setup)
+        DBManager._relation_cache = {}
+        DBManager._indexed_relations = set()
+        DBManager._migrating_relations = set()
+
+        if concurrent and db_path not in MEMORY_DB_PATHS:
+            DBManager.conn.execute("PRAGMA journal_mode = WAL;")
+
+        # create the schema under the write lock, so that processes initializing together do not race
+        DBManager._run_write(DBManager._create_schema)
+
+    @staticmethod
+    def close():
+        """Closes the connections of all threads."""
+        if DBManager._connections is not None:
+            DBManager._connections.close()
+            DBManager._connections = None
+
+    @staticmethod
+    def _create_schema():
+        conn = DBManager.conn
 
         # create a table for keeping track of relations
         conn.execute("""
@@ -59,16 +150,216 @@ class DBManager:
             uid TEXT PRIMARY KEY,
             co_identifier TEXT,
             timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP),
-            orig_metadata_hash TEXT
+            orig_metadata_hash TEXT,
+            codec TEXT,
+            metadata_hash TEXT,
+            size INTEGER,
+            last_access REAL,
+            pinned INTEGER DEFAULT 0
         )
         """)
 
-        DBManager.conn = conn
-    
+        # add columns that are missing in databases created by earlier versions
+        co_columns = {row["name"] for row in conn.execute("PRAGMA table_info(computation_objects)")}
+        if "codec" not in co_columns:
+            conn.execute("ALTER TABLE computation_objects ADD COLUMN codec TEXT")
+        if "metadata_hash" not in co_columns:
+            # the hash of the metadata whose variables are all computed for the object, NULL if it is orig_metadata_hash
+            conn.execute("ALTER TABLE computation_objects ADD COLUMN metadata_hash TEXT")
+        if "size" not in co_columns:
+            # the payload size in bytes and the unix time of the last save or load, NULL until recorded
+            conn.execute("ALTER TABLE computation_objects ADD COLUMN size INTEGER")
+            conn.execute("ALTER TABLE computation_objects ADD COLUMN last_access REAL")
+            conn.execute("ALTER TABLE computation_objects ADD COLUMN pinned INTEGER DEFAULT 0")
+
+        # create a key-value table for settings of the store
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ccache_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """)
+
+        # create a table for memoizing computation function results
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS lineage (
+            func_name TEXT,
+            input_uids TEXT,
+            normal_args TEXT,
+            result_uid TEXT,
+            timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP),
+            PRIMARY KEY (func_name, input_uids, normal_args)
+        )
+        """)
+
+        # create a table for the profiles of computation function calls, by result
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS profiles (
+            result_uid TEXT PRIMARY KEY,
+            func_name TEXT,
+            summary TEXT,
+            stats BLOB,
+            timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """)
+
+        # create a table for the progress of copying rows from older relations into the
+        # relation that replaced them, one row per old relation
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS relation_migrations (
+            target_relation TEXT,
+            source_relation TEXT,
+            position INTEGER,
+            last_rowid INTEGER DEFAULT 0,
+            max_rowid INTEGER,
+            copied INTEGER DEFAULT 0,
+            started DATETIME DEFAULT (CURRENT_TIMESTAMP),
+            finished DATETIME,
+            PRIMARY KEY (target_relation, source_relation)
+        )
+        """)
+
+        # index the lineage of results, which is removed when they are evicted
+        conn.execute("CREATE INDEX IF NOT EXISTS lineage_result_uid_idx ON lineage(result_uid)")
+
+        # index the lookups of the most recent relation of a computation object and of objects by type
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS relations_co_identifier_idx
+        ON relations(co_identifier, timestamp, relation_id)
+        """)
+        # the uid column lets objects of a type be paged through in uid order
+        conn.execute("DROP INDEX IF EXISTS computation_objects_co_identifier_idx")
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS computation_objects_co_identifier_uid_idx
+        ON computation_objects(co_identifier, uid)
+        """)
+
+    @staticmethod
+    def _is_lock_error(e: sql.OperationalError) -> bool:
+        message = str(e)
+        return "locked" in message or "busy" in message
+
+    @staticmethod
+    def _run_write(func: Callable[[], T], commit: bool = True) -> T:
+        """
+        Runs `func` in a write transaction and returns its result. The transaction
+        takes the write lock up front with `BEGIN IMMEDIATE`, so reads in `func`
+        see the data it writes on top of. If another connection holds the lock
+        for longer than the busy timeout, the transaction is rolled back and
+        retried with exponential backoff.
+
+        The transaction is committed afterwards if `commit` is True, and left open
+        for the caller otherwise. If a transaction is already open, `func` runs in
+        it and is not retried, since rolling back would discard the caller's writes.
+        """
+        if DBManager.conn.in_transaction:
+            return func()
+
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                DBManager.conn.execute("BEGIN IMMEDIATE")
+                result = func()
+                if commit:
+                    DBManager.conn.commit()
+                return result
+            except sql.OperationalError as e:
+                DBManager.rollback()
+                if not DBManager._is_lock_error(e) or attempt == WRITE_RETRIES:
+                    raise
+            except BaseException:
+                DBManager.rollback()
+                raise
+
+            # jitter the delay so that processes retrying together do not collide again
+            time.sleep(WRITE_RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def get_meta(key: str) -> str | None:
+        """Returns the value of a setting in the `ccache_meta` table, or None if it is not set."""
+        row = DBManager.conn.execute("SELECT value FROM ccache_meta WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row["value"]
+
+    @staticmethod
+    def set_meta(key: str, value: str | None):
+        """Sets a value in the `ccache_meta` table. A value of None removes the setting."""
+        def write():
+            if value is None:
+                DBManager.conn.execute("DELETE FROM ccache_meta WHERE key = ?", (key,))
+            else:
+                DBManager.conn.execute("INSERT OR REPLACE INTO ccache_meta(key, value) VALUES (?, ?)", (key, value))
+        DBManager._run_write(write)
+
+    @staticmethod
+    def has_computation_objects() -> bool:
+        return DBManager.conn.execute("SELECT 1 FROM computation_objects LIMIT 1").fetchone() is not None
+
     @staticmethod
     def _get_metadata_hash(metadata: ComputationObjectMetadata):
         return hashlib.sha256(metadata.get_string_representation().encode("utf-8")).hexdigest()[:8]
 
+    @staticmethod
+    def _get_object_metadata_hash(object_data: ComputationObjectData) -> str:
+        """The metadata hash of a registered computation object, computed once per process."""
+        metadata_hash = DBManager._metadata_hash_cache.get(object_data.object_identifier)
+        if metadata_hash is None:
+            metadata_hash = DBManager._get_metadata_hash(object_data.metadata)
+            DBManager._metadata_hash_cache[object_data.object_identifier] = metadata_hash
+        return metadata_hash
+
+    @staticmethod
+    def load_relation_cache():
+        """Loads the most recent relation of every computation object into `_relation_cache`."""
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called first")
+
+        local = DBManager._connections.local
+        local.data_version = DBManager._get_data_version()
+        local.relation_cache_generation = DBManager._relation_cache_generation
+        cur = DBManager.conn.execute("""
+            SELECT co_identifier, relation_name, metadata_hash
+            FROM relations AS r
+            WHERE relation_id = (
+                SELECT relation_id FROM relations
+                WHERE co_identifier = r.co_identifier
+                ORDER BY timestamp DESC, relation_id DESC
+                LIMIT 1
+            )
+        """)
+        DBManager._relation_cache = {
+            row["co_identifier"]: (row["relation_name"], row["metadata_hash"])
+            for row in cur.fetchall()
+        }
+        cur = DBManager.conn.execute("SELECT DISTINCT target_relation FROM relation_migrations WHERE finished IS NULL")
+        DBManager._migrating_relations = {row["target_relation"] for row in cur.fetchall()}
+
+    @staticmethod
+    def _get_data_version() -> int:
+        return DBManager.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def _invalidate_relation_cache():
+        """Makes all threads reload the relation cache on their next lookup."""
+        DBManager._relation_cache_generation += 1
+
+    @staticmethod
+    def _get_cached_relation(co_identifier: str) -> tuple[str, str] | None:
+        """
+        Returns the cached `(relation_name, metadata_hash)` of the most recent
+        relation for `co_identifier`, or None if there is none. Reloads the cache
+        if another connection has written to the database since it was loaded.
+        The data version is kept per connection, since it only tracks the commits
+        of other connections.
+        """
+        local = DBManager._connections.local
+        if (
+            getattr(local, "relation_cache_generation", None) != DBManager._relation_cache_generation
+            or DBManager._get_data_version() != local.data_version
+            ):
+            DBManager.load_relation_cache()
+        return DBManager._relation_cache.get(co_identifier)
+
     @staticmethod
     def _create_relation_name(object_data: ComputationObjectData) -> str:
         """non deterministic"""
@@ -78,45 +369,298 @@ class DBManager:
     def _reconcile_relation(relation_id: int, object_data: ComputationObjectData) -> str:
         # get the info of the relation
         cur = DBManager.conn.execute(
-            "SELECT * FROM relations WHERE relation_id = ? ORDER BY timestamp DESC LIMIT 1",
+            "SELECT * FROM relations WHERE relation_id = ?",
             (relation_id,)
         )
         rel = cur.fetchone()
 
-        new_metadata_hash = DBManager._get_metadata_hash(object_data.metadata)
+        new_metadata_hash = DBManager._get_object_metadata_hash(object_data)
         old_metadata_hash = rel["metadata_hash"]
 
         # if the metadata signatures are the same, simply return the old relation name and return
         if (new_metadata_hash == old_metadata_hash):
             return rel["relation_name"]
         
-        # if they differ, create a new relation, and try to copy over the existing values
+        # if they differ, create a new relation. The existing values are copied over in
+        # batches by `migrate_relation_batch`, and read through a view meanwhile
         new_relation_name = DBManager._create_co_relation(object_data)
+        DBManager._start_relation_migration(rel["relation_name"], new_relation_name)
+
+        return new_relation_name
 
-        # get the overlap between old and new fields, copy over those
-        old_meta_vars = ComputationObjectMetadata.string_representation_to_metadata_dict(rel["metadata_rep"])
-        new_meta_vars = object_data.metadata.get_metadata_items()
-        overlap_vars = list(set(old_meta_vars.keys()) & set(new_meta_vars.keys()))
+    @staticmethod
+    def _get_migration_view_name(relation_name: str) -> str:
+        return f"{relation_name}__view"
 
-        select_exprs = ["uid"] + [f"CAST({var} AS {new_meta_vars[var]}) AS {var}" for var in overlap_vars]
-        overlap_vars = ["uid"] + overlap_vars # add uid
+    @staticmethod
+    def _get_read_relation(relation_name: str) -> str:
+        """Returns the name to read the rows of a relation from, which is its view while rows are copied into it."""
+        if relation_name in DBManager._migrating_relations:
+            return DBManager._get_migration_view_name(relation_name)
+        return relation_name
 
-        # query the overlapping values
-        copy_stmt = f"""
-        INSERT INTO {new_relation_name} ({", ".join(str(v) for v in overlap_vars)})
-        SELECT {", ".join(select_exprs)}
-        FROM {rel["relation_name"]}
-        ;
+    @staticmethod
+    def _get_migration_select_exprs(source_relation: str, target_relation: str) -> tuple[list[str], list[str]]:
         """
-        DBManager.conn.execute(copy_stmt)
-        DBManager.conn.commit()
+        Returns the columns of `target_relation` and the expressions that select them
+        from a row `s` of `source_relation`. Columns the source does not have are NULL.
+        """
+        source_columns = {row["name"] for row in DBManager.conn.execute(f'PRAGMA table_info("{source_relation}")')}
+        columns, exprs = [], []
+        for row in DBManager.conn.execute(f'PRAGMA table_info("{target_relation}")'):
+            var = row["name"]
+            columns.append(f'"{var}"')
+            if var == "uid":
+                exprs.append("s.uid")
+            elif var in source_columns:
+                exprs.append(f'CAST(s."{var}" AS {row["type"]})')
+            else:
+                exprs.append("NULL")
+        return columns, exprs
 
-        return new_relation_name
+    @staticmethod
+    def _start_relation_migration(old_relation: str, new_relation: str):
+        """
+        Records that the rows of `old_relation` have to be copied into `new_relation`,
+        and creates the view that `new_relation` is read through until they are.
+        If rows of even older relations were still being copied into `old_relation`,
+        they are copied into `new_relation` directly instead.
+        """
+        conn = DBManager.conn
+        cur = conn.execute(
+            "SELECT source_relation FROM relation_migrations WHERE target_relation = ? AND finished IS NULL ORDER BY position",
+            (old_relation,)
+        )
+        # newer relations come first, since their rows take precedence
+        sources = [old_relation] + [row["source_relation"] for row in cur.fetchall()]
+        conn.execute("DELETE FROM relation_migrations WHERE target_relation = ? AND finished IS NULL", (old_relation,))
+        conn.execute(f'DROP VIEW IF EXISTS "{DBManager._get_migration_view_name(old_relation)}"')
+
+        migrated_sources = []
+        for source in sources:
+            max_rowid = conn.execute(f'SELECT MAX(rowid) FROM "{source}"').fetchone()[0]
+            if max_rowid is None:
+                continue
+            conn.execute(
+                "INSERT INTO relation_migrations(target_relation, source_relation, position, max_rowid) VALUES (?, ?, ?, ?)",
+                (new_relation, source, len(migrated_sources), max_rowid)
+            )
+            migrated_sources.append(source)
+
+        if not migrated_sources:
+            return
+
+        # the view holds the rows of the new relation, and the rows of the older
+        # relations that are in none of the relations before them
+        newer = [new_relation]
+        selects = []
+        for source in migrated_sources:
+            columns, exprs = DBManager._get_migration_select_exprs(source, new_relation)
+            if not selects:
+                selects.append(f'SELECT {", ".join(columns)} FROM "{new_relation}"')
+            exprs = [f"{expr} AS {column}" for expr, column in zip(exprs, columns)]
+            not_copied = " AND ".join(f'NOT EXISTS (SELECT 1 FROM "{n}" WHERE "{n}".uid = s.uid)' for n in newer)
+            selects.append(f'SELECT {", ".join(exprs)} FROM "{source}" AS s WHERE {not_copied}')
+            newer.append(source)
+
+        view_name = DBManager._get_migration_view_name(new_relation)
+        conn.execute(f'CREATE VIEW "{view_name}" AS {" UNION ALL ".join(selects)}')
+        DBManager._migrating_relations.add(new_relation)
+
+    @staticmethod
+    def get_relation_migrations(include_finished: bool = False) -> list[dict]:
+        """
+        Returns the progress of copying rows of older relations into the relations
+        that replaced them when the metadata of a computation object changed, with one
+        dict per older relation. `last_rowid` counts up to `max_rowid` while it is copied.
+        """
+        cur = DBManager.conn.execute(
+            f"""
+            SELECT r.co_identifier, m.target_relation, m.source_relation, m.position, m.last_rowid,
+                m.max_rowid, m.copied, m.started, m.finished
+            FROM relation_migrations AS m
+            JOIN relations AS r ON r.relation_name = m.target_relation
+            {"" if include_finished else "WHERE m.finished IS NULL"}
+            ORDER BY m.started, m.target_relation, m.position
+            """
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+    @staticmethod
+    def migrate_relation_batch(co_identifier: str | None = None, batch_size: int = MIGRATION_BATCH_SIZE) -> int | None:
+        """
+        Copies up to `batch_size` rows of an older relation into the relation that
+        replaced it, in one write transaction, and records the progress. Only
+        migrations of `co_identifier` are considered if it is given.
+
+        Returns the number of copied rows, or None if there is nothing left to copy.
+        Rows that were copied or saved to the new relation already are skipped.
+        """
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called first")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive; was {batch_size}")
+
+        return DBManager._run_write(lambda: DBManager._migrate_relation_batch(co_identifier, batch_size))
+
+    @staticmethod
+    def _migrate_relation_batch(co_identifier: str | None, batch_size: int) -> int | None:
+        conn = DBManager.conn
+        cur = conn.execute(
+            """
+            SELECT m.target_relation, m.source_relation, m.last_rowid, m.max_rowid
+            FROM relation_migrations AS m
+            JOIN relations AS r ON r.relation_name = m.target_relation
+            WHERE m.finished IS NULL AND (? IS NULL OR r.co_identifier = ?)
+            ORDER BY m.started, m.target_relation, m.position
+            LIMIT 1
+            """,
+            (co_identifier, co_identifier)
+        )
+        mig = cur.fetchone()
+        if mig is None:
+            return None
+
+        target, source = mig["target_relation"], mig["source_relation"]
+        columns, exprs = DBManager._get_migration_select_exprs(source, target)
+
+        # find the rowid that ends the batch, so that each batch is a range of rowids
+        row = conn.execute(
+            f'SELECT rowid FROM "{source}" WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT 1 OFFSET ?',
+            (mig["last_rowid"], mig["max_rowid"], batch_size - 1)
+        ).fetchone()
+        end_rowid = mig["max_rowid"] if row is None else row[0]
+
+        cur = conn.execute(
+            f"""
+            INSERT OR IGNORE INTO "{target}" ({", ".join(columns)})
+            SELECT {", ".join(exprs)} FROM "{source}" AS s
+            WHERE s.rowid > ? AND s.rowid <= ?
+            """,
+            (mig["last_rowid"], end_rowid)
+        )
+        n_copied = cur.rowcount
+        finished = end_rowid >= mig["max_rowid"]
+        conn.execute(
+            """
+            UPDATE relation_migrations
+            SET last_rowid = ?, copied = copied + ?, finished = CASE WHEN ? THEN CURRENT_TIMESTAMP END
+            WHERE target_relation = ? AND source_relation = ?
+            """,
+            (end_rowid, n_copied, finished, target, source)
+        )
+
+        if finished:
+            pending = conn.execute(
+                "SELECT 1 FROM relation_migrations WHERE target_relation = ? AND finished IS NULL",
+                (target,)
+            ).fetchone()
+            if pending is None:
+                # keep the view as an alias of the relation, since readers may have resolved it already
+                view_name = DBManager._get_migration_view_name(target)
+                conn.execute(f'DROP VIEW IF EXISTS "{view_name}"')
+                conn.execute(f'CREATE VIEW "{view_name}" AS SELECT * FROM "{target}"')
+                DBManager._migrating_relations.discard(target)
+
+        return n_copied
+
+    @staticmethod
+    def migrate_relations(
+        co_identifier: str | None = None,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        pause: float = 0.0,
+        on_batch: Callable[[int], None] | None = None,
+        ) -> int:
+        """
+        Copies rows of older relations into the relations that replaced them in
+        batches of `batch_size` until nothing is left, waiting `pause` seconds
+        between batches so that other writers get the write lock. Calls `on_batch`
+        with the number of copied rows after every batch.
+
+        Returns the number of copied rows. The progress is stored after every
+        batch, so an interrupted migration continues where it stopped.
+        """
+        n_copied = 0
+        while (n := DBManager.migrate_relation_batch(co_identifier, batch_size)) is not None:
+            n_copied += n
+            if on_batch is not None:
+                on_batch(n)
+            if pause > 0:
+                time.sleep(pause)
+        return n_copied
+
+    @staticmethod
+    def get_metadata_reps(co_identifier: str) -> dict[str, str]:
+        """Returns the metadata string representations of every relation of a computation object, by metadata hash."""
+        cur = DBManager.conn.execute(
+            "SELECT metadata_hash, metadata_rep FROM relations WHERE co_identifier = ?",
+            (co_identifier,)
+        )
+        return {row["metadata_hash"]: row["metadata_rep"] for row in cur.fetchall()}
+
+    @staticmethod
+    def get_stale_metadata_objects(
+        object_data: ComputationObjectData,
+        after_uid: str | None = None,
+        limit: int = QUERY_FETCH_BATCH_SIZE,
+        ) -> list[tuple[str, str]]:
+        """
+        Returns `(uid, metadata_hash)` tuples of up to `limit` objects of a computation
+        object whose metadata was computed for other metadata than the current one,
+        ordered by uid and starting after `after_uid`. `metadata_hash` is the hash of
+        the metadata the object's variables were computed for.
+        """
+        cur = DBManager.conn.execute(
+            """
+            SELECT uid, COALESCE(metadata_hash, orig_metadata_hash) AS metadata_hash
+            FROM computation_objects
+            WHERE co_identifier = ? AND COALESCE(metadata_hash, orig_metadata_hash) != ? AND uid > ?
+            ORDER BY uid
+            LIMIT ?
+            """,
+            (object_data.object_identifier, DBManager._get_object_metadata_hash(object_data), after_uid or "", limit)
+        )
+        return [(row["uid"], row["metadata_hash"]) for row in cur.fetchall()]
+
+    @staticmethod
+    def update_computation_object_metadata(object_data: ComputationObjectData, rows: list[tuple[str, dict]]):
+        """
+        Writes recomputed metadata variables of stored objects in one write transaction,
+        given as `(uid, {varname: value})` tuples, and marks the objects as having
+        all variables of the current metadata. Variables that are not given are kept.
+        """
+        if not rows:
+            return
+
+        def write():
+            relation_name = DBManager._get_co_relation(object_data)
+            # rows with the same variables are written with one statement
+            rows_by_vars: dict[tuple[str, ...], list[tuple[str, dict]]] = {}
+            for uid, metadata in rows:
+                rows_by_vars.setdefault(tuple(metadata.keys()), []).append((uid, metadata))
+
+            for varnames, var_rows in rows_by_vars.items():
+                if not varnames:
+                    continue
+                columns = ", ".join(f'"{var}"' for var in varnames)
+                placeholders = ", ".join(["?"] * (len(varnames) + 1))
+                updates = ", ".join(f'"{var}" = excluded."{var}"' for var in varnames)
+                DBManager.conn.executemany(
+                    f'INSERT INTO "{relation_name}" (uid, {columns}) VALUES ({placeholders}) ON CONFLICT(uid) DO UPDATE SET {updates}',
+                    ([uid] + [metadata[var] for var in varnames] for uid, metadata in var_rows)
+                )
+
+            DBManager.conn.executemany(
+                "UPDATE computation_objects SET metadata_hash = ? WHERE uid = ?",
+                ((DBManager._get_object_metadata_hash(object_data), uid) for uid, _ in rows)
+            )
+
+        DBManager._run_write(write)
 
     @staticmethod
     def _create_co_relation(object_data: ComputationObjectData) -> str:
         new_relation_name = DBManager._create_relation_name(object_data) # new table including a uuid
-        new_metadata_hash = DBManager._get_metadata_hash(object_data.metadata)
+        new_metadata_hash = DBManager._get_object_metadata_hash(object_data)
         new_relation_stmt = f"""
         CREATE TABLE {new_relation_name} (
         uid TEXT PRIMARY KEY,
@@ -143,18 +687,40 @@ class DBManager:
             object_data.metadata.get_string_representation(),
             new_metadata_hash
             ))
-        DBManager.conn.commit()
+
+        DBManager._relation_cache[object_data.object_identifier] = (new_relation_name, new_metadata_hash)
         return new_relation_name
 
+    @staticmethod
+    def ensure_co_relation(object_data: ComputationObjectData) -> str:
+        """
+        Returns the relation of the current metadata of a computation object. If the
+        metadata changed since the last save, the relation is created and the migration
+        of the rows of the older relations into it is started.
+        """
+        return DBManager._get_co_relation(object_data)
 
     @staticmethod
     def _get_co_relation(object_data: ComputationObjectData) -> str:
         if DBManager.conn is None:
             raise RuntimeError("DBManager.initialize must be called before creating relations")
 
+        # if the cached relation has the same metadata, it is up to date
+        cached = DBManager._get_cached_relation(object_data.object_identifier)
+        if cached is not None and cached[1] == DBManager._get_object_metadata_hash(object_data):
+            if cached[0] not in DBManager._indexed_relations:
+                DBManager._run_write(lambda: DBManager._sync_indexes(cached[0], object_data))
+            return cached[0]
+
+        # resolve the relation under the write lock, so that processes saving a new type
+        # together do not each create a relation for it
+        return DBManager._run_write(lambda: DBManager._resolve_co_relation(object_data))
+
+    @staticmethod
+    def _resolve_co_relation(object_data: ComputationObjectData) -> str:
         # Check most-recent relation for this computation object identifier
         cur = DBManager.conn.execute(
-            "SELECT relation_id, relation_name, metadata_rep FROM relations WHERE co_identifier = ? ORDER BY timestamp DESC LIMIT 1",
+            "SELECT relation_id, relation_name, metadata_rep FROM relations WHERE co_identifier = ? ORDER BY timestamp DESC, relation_id DESC LIMIT 1",
             (object_data.object_identifier,)
         )
         row = cur.fetchone()
@@ -166,7 +732,41 @@ class DBManager:
         else:
             relation_name = DBManager._create_co_relation(object_data)
 
+        DBManager._sync_indexes(relation_name, object_data)
+        DBManager._relation_cache[object_data.object_identifier] = (
+            relation_name, DBManager._get_object_metadata_hash(object_data)
+            )
         return relation_name
+
+    @staticmethod
+    def _get_index_name(relation_name: str, varnames: tuple[str, ...]) -> str:
+        return f"{relation_name}__{"_".join(varnames)}_idx"
+
+    @staticmethod
+    def _sync_indexes(relation_name: str, object_data: ComputationObjectData):
+        """
+        Creates the indexes declared on the metadata of `object_data` on a relation,
+        and drops the indexes that were declared before but are not anymore.
+        """
+        declared = {
+            DBManager._get_index_name(relation_name, varnames): varnames
+            for varnames in object_data.metadata.get_indexes()
+        }
+        cur = DBManager.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+            (relation_name,)
+        )
+        # indexes SQLite creates for the primary key are named sqlite_autoindex_*
+        existing = {row["name"] for row in cur.fetchall() if row["name"].startswith(f"{relation_name}__")}
+
+        for index_name in existing - declared.keys():
+            DBManager.conn.execute(f'DROP INDEX "{index_name}"')
+        for index_name, varnames in declared.items():
+            if index_name not in existing:
+                columns = ", ".join(f'"{var}"' for var in varnames)
+                DBManager.conn.execute(f'CREATE INDEX "{index_name}" ON "{relation_name}" ({columns})')
+
+        DBManager._indexed_relations.add(relation_name)
             
 
 
@@ -182,11 +782,15 @@ class DBManager:
         if DBManager.conn is None:
             raise RuntimeError("DBManager.initialize must be called before inserting objects")
 
+        # the metadata setters run before taking the write lock, since they may be slow
+        metadata = object_data.metadata.compute_metadata(obj)
+        DBManager._run_write(lambda: DBManager._insert_computation_object(uid, metadata, object_data))
+
+    @staticmethod
+    def _insert_computation_object(uid: str, metadata: dict, object_data: ComputationObjectData):
         # ensure table exists (schema derived from metadata description)
         relation_name = DBManager._get_co_relation(object_data)
 
-        # compute the metadata values
-        metadata = object_data.metadata.compute_metadata(obj)
         # metadata is expected to be a dict varname->value
         cols = ["uid"] + list(metadata.keys())
         placeholders = ",".join(["?"] * len(cols))
@@ -197,13 +801,411 @@ class DBManager:
 
         # insert into the table tracking computation objects
         co_stmt = f"""
-        INSERT INTO computation_objects(uid, co_identifier, orig_metadata_hash)
-        VALUES (?, ?, ?)
+        INSERT INTO computation_objects(uid, co_identifier, orig_metadata_hash, codec, metadata_hash)
+        VALUES (?, ?, ?, ?, ?)
         """
-        DBManager.conn.execute(co_stmt, (uid, object_data.object_identifier, DBManager._get_metadata_hash(object_data.metadata)))
+        metadata_hash = DBManager._get_object_metadata_hash(object_data)
+        DBManager.conn.execute(co_stmt, (uid, object_data.object_identifier, metadata_hash, object_data.codec, metadata_hash))
+
+    @staticmethod
+    def insert_computation_objects(objs_and_uids: list[tuple[any, str]], object_data: ComputationObjectData) -> set[str]:
+        """Insert many computation objects of the same type and their metadata.
 
+        The metadata of the objects whose uid does not exist yet is computed first,
+        and then inserted with `insert_computation_object_rows`. Objects whose uid
+        already exists in the database are skipped and their uids are returned.
+        Repeated uids in `objs_and_uids` are inserted once.
+
+        Does not commit; call it in a `DBManager.transaction()` block, or call
+        `DBManager.commit` or `DBManager.rollback` afterwards.
+        """
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called before inserting objects")
+
+        existing = DBManager.get_existing_uids([uid for _, uid in objs_and_uids])
+        seen = set(existing)
+        rows = []
+        for obj, uid in objs_and_uids:
+            if uid in seen:
+                continue
+            seen.add(uid)
+            rows.append((uid, object_data.metadata.compute_metadata(obj)))
+
+        return existing | DBManager.insert_computation_object_rows(rows, object_data)
+
+    @staticmethod
+    def insert_computation_object_rows(rows: list[tuple[str, dict]], object_data: ComputationObjectData) -> set[str]:
+        """
+        Inserts computation objects of the same type given as `(uid, metadata)` rows,
+        with `executemany`. Rows whose uid already exists in the database are skipped
+        and their uids are returned. Repeated uids are inserted once.
+
+        The metadata is computed by the caller, so that no user code runs while the
+        write lock is held. Does not commit, like `insert_computation_objects`.
+        """
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called before inserting objects")
+
+        return DBManager._run_write(
+            lambda: DBManager._insert_computation_object_rows(rows, object_data),
+            commit=False
+            )
+
+    @staticmethod
+    def _insert_computation_object_rows(rows: list[tuple[str, dict]], object_data: ComputationObjectData) -> set[str]:
+        relation_name = DBManager._get_co_relation(object_data)
+
+        # find the rows that would violate the uid primary keys
+        conflicts = DBManager._get_existing_uids([uid for uid, _ in rows])
+        seen = set(conflicts)
+        new_rows = []
+        for uid, metadata in rows:
+            if uid in seen:
+                continue
+            seen.add(uid)
+            new_rows.append((uid, metadata))
+        rows = new_rows
+
+        if not rows:
+            return conflicts
+
+        cols = list(rows[0][1].keys())
+        placeholders = ",".join(["?"] * (len(cols) + 1))
+        stmt = f'INSERT INTO "{relation_name}" ({",".join(["uid"] + cols)}) VALUES ({placeholders})'
+        DBManager.conn.executemany(stmt, ([uid] + [metadata.get(k) for k in cols] for uid, metadata in rows))
+
+        metadata_hash = DBManager._get_object_metadata_hash(object_data)
+        co_stmt = f"""
+        INSERT INTO computation_objects(uid, co_identifier, orig_metadata_hash, codec, metadata_hash)
+        VALUES (?, ?, ?, ?, ?)
+        """
+        DBManager.conn.executemany(co_stmt, ((uid, object_data.object_identifier, metadata_hash, object_data.codec, metadata_hash) for uid, _ in rows))
+
+        return conflicts
+
+    @staticmethod
+    def _iter_param_chunks(values: list, max_size: int = SQLITE_MAX_VARIABLES) -> Iterator[tuple[list, str]]:
+        """
+        Splits `values` into chunks of at most `max_size` values to bind to an `IN`
+        list, and yields each chunk with its `?, ?, ...` placeholders. The last chunk
+        is padded to a power of two (or `max_size`) by repeating its last value, so
+        that statements only have a few distinct lengths and are reused from the
+        statement cache of the connection instead of being parsed again.
+        """
+        for i in range(0, len(values), max_size):
+            chunk = values[i:i + max_size]
+            size = min(max_size, 1 << (len(chunk) - 1).bit_length())
+            chunk = chunk + [chunk[-1]] * (size - len(chunk))
+            yield chunk, ",".join(["?"] * size)
+
+    @staticmethod
+    def get_existing_uids(uids: list[str]) -> set[str]:
+        """Returns the subset of `uids` that exist in the computation_objects table."""
+        return DBManager._get_existing_uids(uids)
+
+    @staticmethod
+    def _get_existing_uids(uids: list[str]) -> set[str]:
+        existing = set()
+        for chunk, placeholders in DBManager._iter_param_chunks(uids):
+            cur = DBManager.conn.execute(
+                f"SELECT uid FROM computation_objects WHERE uid IN ({placeholders})",
+                chunk
+            )
+            existing.update(r["uid"] for r in cur.fetchall())
+        return existing
+
+    @staticmethod
+    def get_co_identifiers(uids: list[str]) -> dict[str, str]:
+        """Returns the computation object identifiers of the given uids. Unknown uids are left out."""
+        return DBManager._get_co_identifiers(uids)
+
+    @staticmethod
+    def _get_co_identifiers(uids: list[str]) -> dict[str, str]:
+        co_identifiers = {}
+        for chunk, placeholders in DBManager._iter_param_chunks(uids):
+            cur = DBManager.conn.execute(
+                f"SELECT uid, co_identifier FROM computation_objects WHERE uid IN ({placeholders})",
+                chunk
+            )
+            co_identifiers.update((r["uid"], r["co_identifier"]) for r in cur.fetchall())
+        return co_identifiers
+
+    @staticmethod
+    def get_codecs(uids: list[str]) -> dict[str, str]:
+        """
+        Returns the codecs the payloads of the given uids were written with.
+        Uids of payloads written without compression are left out.
+        """
+        codecs = {}
+        for chunk, placeholders in DBManager._iter_param_chunks(uids):
+            cur = DBManager.conn.execute(
+                f"""
+                SELECT uid, codec FROM computation_objects
+                WHERE uid IN ({placeholders}) AND codec IS NOT NULL AND codec != 'none'
+                """,
+                chunk
+            )
+            codecs.update((r["uid"], r["codec"]) for r in cur.fetchall())
+        return codecs
+
+    @staticmethod
+    def get_compressed_co_identifiers() -> set[str]:
+        """Returns the identifiers of computation objects that have compressed payloads."""
+        cur = DBManager.conn.execute(
+            "SELECT DISTINCT co_identifier FROM computation_objects WHERE codec IS NOT NULL AND codec != 'none'"
+        )
+        return {r["co_identifier"] for r in cur.fetchall()}
+
+    @staticmethod
+    def record_usage(rows: list[tuple[str, int | None, float | None]]):
+        """
+        Records `(uid, size, last_access)` tuples of objects, where `size` is the payload
+        size in bytes and `last_access` the unix time the object was saved or loaded.
+        None keeps the recorded value.
+        """
+        if not rows:
+            return
+
+        DBManager._run_write(lambda: DBManager.conn.executemany(
+            """
+            UPDATE computation_objects
+            SET size = COALESCE(?, size), last_access = MAX(COALESCE(?, last_access), COALESCE(last_access, 0))
+            WHERE uid = ?
+            """,
+            ((size, last_access, uid) for uid, size, last_access in rows)
+        ))
+
+    @staticmethod
+    def get_uids_without_size(after_uid: str | None = None, limit: int = QUERY_FETCH_BATCH_SIZE) -> list[str]:
+        """Returns up to `limit` uids of objects whose payload size has not been recorded, ordered by uid and starting after `after_uid`."""
+        cur = DBManager.conn.execute(
+            "SELECT uid FROM computation_objects WHERE size IS NULL AND uid > ? ORDER BY uid LIMIT ?",
+            (after_uid or "", limit)
+        )
+        return [row["uid"] for row in cur.fetchall()]
+
+    @staticmethod
+    def set_pinned(uids: list[str], pinned: bool = True):
+        """Pins or unpins objects. Pinned objects are never evicted."""
+        def write():
+            for chunk, placeholders in DBManager._iter_param_chunks(uids, SQLITE_MAX_VARIABLES - 1):
+                DBManager.conn.execute(
+                    f"UPDATE computation_objects SET pinned = ? WHERE uid IN ({placeholders})",
+                    [int(pinned), *chunk]
+                )
+        DBManager._run_write(write)
+
+    @staticmethod
+    def get_store_size() -> int:
+        """Returns the recorded payload size of all objects in bytes."""
+        return DBManager.conn.execute("SELECT COALESCE(SUM(size), 0) FROM computation_objects").fetchone()[0]
+
+    @staticmethod
+    def iter_eviction_candidates(
+        by_size: bool = False,
+        co_identifier: str | None = None,
+        accessed_before: float | None = None,
+        ) -> Iterator[tuple[str, int]]:
+        """
+        Returns an iterator of `(uid, size)` tuples of the objects that are not pinned,
+        and are not inputs of memoized results without being results themselves,
+        least recently used first. Objects whose access was not recorded count as
+        accessed when they were saved. If `by_size` is True, the objects are ordered by
+        their size times the time since their last access instead, so that large
+        objects go before small ones that were unused for as long.
+
+        Only objects of `co_identifier` and objects last accessed before the unix time
+        `accessed_before` are returned if given.
+        """
+        last_access = "COALESCE(last_access, CAST(strftime('%s', timestamp) AS REAL))"
+        order = f"(? - {last_access}) * COALESCE(size, 0) DESC" if by_size else f"{last_access}"
+        # the lineage roots are found once by splitting the comma separated input uids
+        cur = DBManager.conn.execute(
+            f"""
+            WITH RECURSIVE input_uids(uid, rest) AS (
+                SELECT '', input_uids || ',' FROM lineage
+                UNION ALL
+                SELECT substr(rest, 1, instr(rest, ',') - 1), substr(rest, instr(rest, ',') + 1)
+                FROM input_uids WHERE rest <> ''
+            ),
+            lineage_roots(uid) AS (
+                SELECT uid FROM input_uids WHERE uid <> ''
+                EXCEPT SELECT result_uid FROM lineage
+            )
+            SELECT uid, COALESCE(size, 0) AS size
+            FROM computation_objects
+            WHERE NOT pinned AND (? IS NULL OR co_identifier = ?) AND (? IS NULL OR {last_access} < ?)
+                AND uid NOT IN lineage_roots
+            ORDER BY {order}, uid
+            """,
+            (co_identifier, co_identifier, accessed_before, accessed_before) + ((time.time(),) if by_size else ())
+        )
+        return ((row["uid"], row["size"]) for row in DBManager._iter_cursor(cur, QUERY_FETCH_BATCH_SIZE))
+
+    @staticmethod
+    def delete_computation_objects(uids: list[str]):
+        """
+        Deletes objects from the database in one write transaction: their rows in
+        computation_objects, their metadata rows in every relation of their type,
+        and the memoized results and profiles they are the result of. Their payloads
+        are not removed.
+        """
+        if not uids:
+            return
+
+        def write():
+            uids_by_type: dict[str, list[str]] = {}
+            for uid, co_identifier in DBManager._get_co_identifiers(uids).items():
+                uids_by_type.setdefault(co_identifier, []).append(uid)
+
+            for co_identifier, type_uids in uids_by_type.items():
+                # rows may still be in older relations while they are migrated
+                cur = DBManager.conn.execute("SELECT relation_name FROM relations WHERE co_identifier = ?", (co_identifier,))
+                for relation_name in [row["relation_name"] for row in cur.fetchall()]:
+                    for chunk, placeholders in DBManager._iter_param_chunks(type_uids):
+                        DBManager.conn.execute(f'DELETE FROM "{relation_name}" WHERE uid IN ({placeholders})', chunk)
+
+            for chunk, placeholders in DBManager._iter_param_chunks(uids):
+                DBManager.conn.execute(f"DELETE FROM computation_objects WHERE uid IN ({placeholders})", chunk)
+                DBManager.conn.execute(f"DELETE FROM lineage WHERE result_uid IN ({placeholders})", chunk)
+                DBManager.conn.execute(f"DELETE FROM profiles WHERE result_uid IN ({placeholders})", chunk)
+
+        DBManager._run_write(write)
+
+    @staticmethod
+    @contextmanager
+    def transaction() -> Iterator[sql.Connection]:
+        """
+        Scopes a write transaction on the connection of the calling thread. It
+        commits when the block exits and rolls back when the block raises. Writes
+        of `DBManager` methods in the block join the transaction, and so do
+        nested `transaction()` blocks.
+        """
+        if DBManager.conn.in_transaction:
+            yield DBManager.conn
+            return
+
+        # take the write lock, retrying while another connection holds it
+        DBManager._run_write(lambda: None, commit=False)
+        try:
+            yield DBManager.conn
+        except BaseException:
+            DBManager.rollback()
+            raise
+        DBManager.commit()
+
+    @staticmethod
+    def commit():
         DBManager.conn.commit()
 
+    @staticmethod
+    def rollback():
+        DBManager.conn.rollback()
+        # relations and indexes created in the transaction may have been cached, so reload the caches
+        DBManager._invalidate_relation_cache()
+        DBManager._indexed_relations = set()
+
+    @staticmethod
+    def computation_object_exists(uid: str) -> bool:
+        cur = DBManager.conn.execute(
+            "SELECT 1 FROM computation_objects WHERE uid = ?",
+            (uid,)
+        )
+        return cur.fetchone() is not None
+
+    @staticmethod
+    def get_lineage_result(func_name: str, input_uids: str, normal_args: str) -> str | None:
+        """
+        Returns the uid of the memoized result of calling `func_name` with the
+        given inputs, or None if there is no such result in the database.
+        """
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called first")
+
+        cur = DBManager.conn.execute(
+            """
+            SELECT l.result_uid
+            FROM lineage AS l
+            JOIN computation_objects AS co
+            ON l.result_uid = co.uid
+            WHERE l.func_name = ? AND l.input_uids = ? AND l.normal_args = ?
+            """,
+            (func_name, input_uids, normal_args)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return row["result_uid"]
+
+    @staticmethod
+    def get_lineage_results(func_name: str, input_uids_list: list[str], normal_args: str) -> dict[str, str]:
+        """
+        Looks up the memoized results of calling `func_name` with many inputs and
+        the same normal args. Returns a dict from input uids to result uid, which
+        leaves out the inputs without a memoized result.
+        """
+        results = {}
+        for chunk, placeholders in DBManager._iter_param_chunks(input_uids_list, SQLITE_MAX_VARIABLES - 2):
+            cur = DBManager.conn.execute(
+                f"""
+                SELECT l.input_uids, l.result_uid
+                FROM lineage AS l
+                JOIN computation_objects AS co
+                ON l.result_uid = co.uid
+                WHERE l.func_name = ? AND l.normal_args = ? AND l.input_uids IN ({placeholders})
+                """,
+                [func_name, normal_args, *chunk]
+            )
+            results.update((r["input_uids"], r["result_uid"]) for r in cur.fetchall())
+        return results
+
+    @staticmethod
+    def insert_lineage(func_name: str, input_uids: str, normal_args: str, result_uid: str):
+        """Records that calling `func_name` with the given inputs resulted in `result_uid`."""
+        if DBManager.conn is None:
+            raise RuntimeError("DBManager.initialize must be called first")
+
+        DBManager._run_write(lambda: DBManager.conn.execute(
+            """
+            INSERT OR REPLACE INTO lineage(func_name, input_uids, normal_args, result_uid)
+            VALUES (?, ?, ?, ?)
+            """,
+            (func_name, input_uids, normal_args, result_uid)
+        ))
+
+    @staticmethod
+    def insert_profile(result_uid: str, func_name: str, summary: str, stats: bytes):
+        """Stores the profile of the call of `func_name` that resulted in `result_uid`, replacing an older one."""
+        DBManager._run_write(lambda: DBManager.conn.execute(
+            """
+            INSERT OR REPLACE INTO profiles(result_uid, func_name, summary, stats)
+            VALUES (?, ?, ?, ?)
+            """,
+            (result_uid, func_name, summary, stats)
+        ))
+
+    @staticmethod
+    def get_profile(result_uid: str) -> sql.Row | None:
+        """Returns the profile row of the call that resulted in `result_uid`, or None if it was not profiled."""
+        return DBManager.conn.execute(
+            "SELECT result_uid, func_name, summary, stats, timestamp FROM profiles WHERE result_uid = ?",
+            (result_uid,)
+        ).fetchone()
+
+    @staticmethod
+    def insert_lineages(func_name: str, rows: list[tuple[str, str, str]]):
+        """Records many `(input_uids, normal_args, result_uid)` results of calling `func_name`."""
+        if not rows:
+            return
+
+        DBManager._run_write(lambda: DBManager.conn.executemany(
+            """
+            INSERT OR REPLACE INTO lineage(func_name, input_uids, normal_args, result_uid)
+            VALUES (?, ?, ?, ?)
+            """,
+            ((func_name, *row) for row in rows)
+        ))
+
     @staticmethod 
     def _resolve_query(query: str, remove_semicolons: bool = False):
         
@@ -213,17 +1215,9 @@ class DBManager:
 
             # see if the match is a relation name
             identifier = m[1:]
-            stmt = f"""
-                SELECT relation_name FROM relations
-                WHERE co_identifier = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-                ; 
-            """
-            cur = DBManager.conn.execute(stmt, (identifier, ))
-            res = cur.fetchone()
+            res = DBManager._get_cached_relation(identifier)
             if res is not None:
-                rel_name = res["relation_name"]
+                rel_name = DBManager._get_read_relation(res[0])
                 print(rel_name)
                 resolved_query = resolved_query.replace(m, rel_name)
 
@@ -232,44 +1226,77 @@ class DBManager:
     
         return resolved_query
 
+    @staticmethod
+    def _iter_cursor(cur: sql.Cursor, batch_size: int) -> Iterator[sql.Row]:
+        """Yields the rows of a cursor, fetching `batch_size` at a time, and closes it afterwards."""
+        try:
+            while rows := cur.fetchmany(batch_size):
+                yield from rows
+        finally:
+            try:
+                cur.close()
+            except sql.ProgrammingError:
+                pass # the connection was closed first, e.g. when an abandoned iterator is collected at exit
+
     @staticmethod
     def query(query: str):
         """
         performs a query.
         Words prefixed by ":" are replaced.
         """
+        return list(DBManager.iter_query(query))
+
+    @staticmethod
+    def iter_query(query: str, batch_size: int = QUERY_FETCH_BATCH_SIZE) -> Iterator[sql.Row]:
+        """
+        Performs a query like `query`, but returns an iterator that fetches the
+        result rows in batches of `batch_size` instead of all at once. The query
+        is executed right away, so errors are raised by this call.
+
+        Statements that write are committed, unless a transaction was already
+        open, e.g. a `transaction()` block, which they then join.
+        """
         res_query = DBManager._resolve_query(query)
+        in_transaction = DBManager.conn.in_transaction
         cur = DBManager.conn.execute(res_query)
-        DBManager.conn.commit()
-        res = cur.fetchall()
-
-        if res is None: return []
-        return res
+        if not in_transaction and DBManager.conn.in_transaction:
+            DBManager.conn.commit()
+        return DBManager._iter_cursor(cur, batch_size)
     
     @staticmethod
     def get_uids_and_co_ids(query: str): # Chatgpt generated
         """
         Returns a list of (uid, co_identifier) tuples.
         """
+        return list(DBManager.iter_uids_and_co_ids(query))
+
+    @staticmethod
+    def iter_uids_and_co_ids(query: str, batch_size: int = QUERY_FETCH_BATCH_SIZE) -> Iterator[tuple[str, str]]:
+        """
+        Returns an iterator of the (uid, co_identifier) tuples of `get_uids_and_co_ids`,
+        fetching them in batches of `batch_size`.
+        """
         if DBManager.conn is None:
             raise RuntimeError("DBManager.initialize must be called first")
 
         resolved_query = DBManager._resolve_query(query, remove_semicolons=True)
+        cur = DBManager.conn.execute(resolved_query)
+        if cur.description is None or "uid" not in (column[0] for column in cur.description):
+            cur.close()
+            raise ValueError("the query must select the uid column")
 
-        stmt = f"""
-        SELECT q.uid, co.co_identifier
-        FROM (
-            {resolved_query}
-        ) AS q
-        JOIN computation_objects AS co
-        ON q.uid = co.uid
-        ;
-        """
-
-        cur = DBManager.conn.execute(stmt)
-        rows = cur.fetchall()
+        def iter_batches():
+            # look up the co_identifiers per batch instead of joining, since SQLite
+            # does not keep the order of a subquery in a join
+            try:
+                while rows := cur.fetchmany(batch_size):
+                    uids = [r["uid"] for r in rows]
+                    co_identifiers = DBManager._get_co_identifiers(uids)
+                    yield from ((uid, co_identifiers[uid]) for uid in uids if uid in co_identifiers)
+            finally:
+                cur.close()
 
-        return [(r["uid"], r["co_identifier"]) for r in rows]
+        return iter_batches()
 
 
     @staticmethod
@@ -278,23 +1305,103 @@ class DBManager:
     
     @staticmethod
     def get_rows_for_obj_uids(uids: list[str], co_data: ComputationObjectData):
-        relation = DBManager._get_co_relation(object_data=co_data)
-        query = f"""
-        SELECT * FROM {relation}
-        WHERE uid IN ({", ".join([f"'{uid}'" for uid in uids])});
+        return list(DBManager.iter_rows_for_obj_uids(uids, co_data))
+
+    @staticmethod
+    def iter_rows_for_obj_uids(
+        uids: list[str],
+        co_data: ComputationObjectData,
+        batch_size: int = QUERY_FETCH_BATCH_SIZE,
+        ) -> Iterator[sql.Row]:
         """
-        cur = DBManager.conn.execute(query)
-        res = cur.fetchall()
-        DBManager.conn.commit()
-        
-        return res
+        Returns an iterator of the metadata rows of the given uids, fetched in
+        batches of `batch_size`. The uids are bound as parameters in chunks, or
+        for more than `UID_TEMP_TABLE_THRESHOLD` uids, inserted into a temporary
+        table that the relation is joined with.
+        """
+        relation = DBManager._get_read_relation(DBManager._get_co_relation(object_data=co_data))
+        # every uid must be fetched once, also when it falls into several chunks
+        uids = list(dict.fromkeys(uids))
+        if len(uids) > UID_TEMP_TABLE_THRESHOLD:
+            return DBManager._iter_rows_with_uid_table(relation, uids, batch_size)
+
+        def iter_chunks():
+            for chunk, placeholders in DBManager._iter_param_chunks(uids):
+                cur = DBManager.conn.execute(f'SELECT * FROM "{relation}" WHERE uid IN ({placeholders})', chunk)
+                yield from DBManager._iter_cursor(cur, batch_size)
+
+        return iter_chunks()
+
+    @staticmethod
+    def _iter_rows_with_uid_table(relation: str, uids: list[str], batch_size: int) -> Iterator[sql.Row]:
+        # every call gets its own table, since several of the iterators can be alive at once
+        DBManager._drop_unused_uid_tables()
+        table = f"{UID_TEMP_TABLE_PREFIX}{uuid.uuid4().hex}"
+        DBManager._uid_tables_in_use.add(table)
+        conn = DBManager.conn
+        owns_transaction = not conn.in_transaction
+        conn.execute(f'CREATE TEMP TABLE "{table}" (uid TEXT)')
+        conn.executemany(f'INSERT INTO temp."{table}" (uid) VALUES (?)', ((uid,) for uid in uids))
+        if owns_transaction:
+            # temporary tables are private to the connection, so committing only ends the implicit transaction
+            conn.commit()
+
+        cur = conn.execute(f'SELECT r.* FROM temp."{table}" AS t CROSS JOIN "{relation}" AS r ON r.uid = t.uid')
+
+        def iter_rows():
+            try:
+                yield from DBManager._iter_cursor(cur, batch_size)
+            finally:
+                DBManager._uid_tables_in_use.discard(table)
+                try:
+                    conn.execute(f'DROP TABLE IF EXISTS temp."{table}"')
+                except sql.OperationalError:
+                    pass # other statements are active on the connection, the next call drops the table
+
+        rows = iter_rows()
+        # iterators that are abandoned without being closed leave their table to the next call
+        weakref.finalize(rows, DBManager._uid_tables_in_use.discard, table)
+        return rows
+
+    @staticmethod
+    def _drop_unused_uid_tables():
+        """
+        Drops the temporary uid tables of the calling thread's connection whose iterators
+        are gone. SQLite can not drop tables while other statements on the connection are
+        active, so tables that can not be dropped yet are left to a later call.
+        """
+        conn = DBManager.conn
+        tables = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM temp.sqlite_master WHERE type = 'table' AND substr(name, 1, ?) = ?",
+                (len(UID_TEMP_TABLE_PREFIX), UID_TEMP_TABLE_PREFIX),
+                )
+        ]
+        for table in tables:
+            if table not in DBManager._uid_tables_in_use:
+                try:
+                    conn.execute(f'DROP TABLE IF EXISTS temp."{table}"')
+                except sql.OperationalError:
+                    pass
     
     @staticmethod
     def get_string_rep_for_query_res(query_res) -> str:
-        if not query_res:
-            return "[Empty Relation]"
+        return "\n".join(DBManager.iter_string_rep_for_query_res(query_res, max(1, len(query_res))))
+
+    @staticmethod
+    def iter_string_rep_for_query_res(query_res: Iterable[sql.Row], batch_size: int = QUERY_FETCH_BATCH_SIZE) -> Iterator[str]:
+        """
+        Yields the lines of the table `get_string_rep_for_query_res` formats, taking
+        the rows from an iterable. Only `batch_size` rows are held at a time, so the
+        column widths are computed from the first batch of rows.
+        """
+        query_res = iter(query_res)
+        first_rows = list(itertools.islice(query_res, batch_size))
+        if not first_rows:
+            yield "[Empty Relation]"
+            return
 
-        columns = list(query_res[0].keys())
+        columns = list(first_rows[0].keys())
 
         def get_col_val(row, col_name):
             if col_name == "uid":
@@ -304,7 +1411,7 @@ class DBManager:
         # Build table as strings first
         rows_as_str = [
             [get_col_val(r, c) for c in columns]
-            for r in query_res
+            for r in first_rows
         ]
 
         # Compute column widths (max of header vs data)
@@ -322,21 +1429,17 @@ class DBManager:
                 for i, c in enumerate(columns)
             )
 
-        lines = []
-
         # Header
-        lines.append(format_row(columns))
+        yield format_row(columns)
 
         # Separator
-        lines.append(
-            "-+-".join("-" * col_widths[c] for c in columns)
-        )
+        yield "-+-".join("-" * col_widths[c] for c in columns)
 
         # Data rows
         for row in rows_as_str:
-            lines.append(format_row(row))
-
-        return "\n".join(lines)
+            yield format_row(row)
+        for r in query_res:
+            yield format_row([get_col_val(r, c) for c in columns])
 
 
 
@@ -351,7 +1454,7 @@ class DBManager:
             SELECT relation_name
             FROM relations
             WHERE co_identifier = ?
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, relation_id DESC
             LIMIT 1
             """,
             (object_data.object_identifier,)
@@ -362,7 +1465,7 @@ class DBManager:
             print("No relation found for computation object")
             return
 
-        relation_name = row["relation_name"]
+        relation_name = DBManager._get_read_relation(row["relation_name"])
 
         # fetch all rows
         cur = DBManager.conn.execute(f'SELECT * FROM "{relation_name}"')
@@ -382,3 +1485,39 @@ class DBManager:
         for r in rows:
             print(" | ".join(str(r[c]) for c in columns))
 
+
+# time the query and write entry points. Methods that only wrap one of them, like `query`,
+# are left out, and the entry points call each other through private helpers, so no call
+# is counted twice
+Timings.instrument(DBManager, CATEGORY_DB, (
+    "get_meta",
+    "set_meta",
+    "has_computation_objects",
+    "get_relation_migrations",
+    "migrate_relation_batch",
+    "get_metadata_reps",
+    "get_stale_metadata_objects",
+    "update_computation_object_metadata",
+    "insert_computation_object",
+    "insert_computation_object_rows",
+    "get_existing_uids",
+    "get_co_identifiers",
+    "get_codecs",
+    "get_compressed_co_identifiers",
+    "record_usage",
+    "get_uids_without_size",
+    "set_pinned",
+    "get_store_size",
+    "iter_eviction_candidates",
+    "delete_computation_objects",
+    "computation_object_exists",
+    "get_lineage_result",
+    "get_lineage_results",
+    "insert_lineage",
+    "insert_lineages",
+    "insert_profile",
+    "get_profile",
+    "iter_query",
+    "iter_uids_and_co_ids",
+    "iter_rows_for_obj_uids",
+))
@@ -2,12 +2,17 @@
 # TODO: Replace `print` calls with some logging method on `CacheInterface`
 
 import abc
+import atexit
+import itertools
+import os
 import re
 from dataclasses import dataclass
 import shlex
-from typing import Callable, Any
+from typing import Callable, Any, Iterable
 from .computation_object_refs import CoVars, VARTYPE_LIST, VARTYPE_SINGLE, ComputationObjectReference
-from .db_manager import DBManager
+from .db_manager import DBManager, MIGRATION_BATCH_SIZE
+from .timings import Timings
+from .profiling import ExecProfile, format_stats, PHASE_LOAD_INPUTS, PROFILE_SORT_KEY, PROFILE_LINES
 from .cache_engine import *
 import curses
 
@@ -17,6 +22,8 @@ ARGTYPE_POS   = 1
 ARGTYPE_KW    = 2
 ARGTYPE_FLAG  = 3
 
+DEFAULT_PAGE_SIZE = 100
+
 
 
 
@@ -120,6 +127,36 @@ class Command(abc.ABC):
     def _execute_logic(self, pos_args: list, kw_args: dict, flag_args: set):
         pass
 
+    def _register_page_arguments(self):
+        self.register_argument(ArgInfo(
+            "limit",
+            ARGTYPE_KW,
+            f"The number of query results per page. Defaults to {DEFAULT_PAGE_SIZE} if -page is given.",
+            preprocess_func=lambda x: int(x[0]),
+        ))
+        self.register_argument(ArgInfo(
+            "page",
+            ARGTYPE_KW,
+            "Which page of query results to use, starting from 1.",
+            preprocess_func=lambda x: int(x[0]),
+        ))
+
+    @staticmethod
+    def _paginate(results: Iterable, kw_args: dict) -> Iterable | None:
+        """
+        Returns the page of an iterable of query results selected by -limit and
+        -page, or all results if neither is given. Returns None for invalid pages.
+        """
+        if "limit" not in kw_args and "page" not in kw_args:
+            return results
+
+        limit = kw_args.get("limit", DEFAULT_PAGE_SIZE)
+        page = kw_args.get("page", 1)
+        if limit < 1 or page < 1:
+            CacheInterface.error("-limit and -page must be at least 1!")
+            return None
+        return itertools.islice(results, (page - 1) * limit, page * limit)
+
 
 class SetCommand(Command):
     def initialize(self):
@@ -140,6 +177,20 @@ class SetCommand(Command):
             'To make the variable point to the same object as another variable.',
             aliases=("v",)
         ))
+        self.register_argument(ArgInfo(
+            "load",
+            ARGTYPE_FLAG,
+            'Load the objects of a query right away instead of when they are first used.',
+            aliases=("l",)
+        ))
+        self.register_argument(ArgInfo(
+            "workers",
+            ARGTYPE_KW,
+            'The number of threads to load the objects of a query with.',
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("w",)
+        ))
+        self._register_page_arguments()
 
     def _execute_logic(self, pos_args, kw_args, flag_args):
         varname = pos_args[0]
@@ -148,29 +199,35 @@ class SetCommand(Command):
             query = kw_args["query"][0]
 
             try:
-                ucs = DBManager.get_uids_and_co_ids(query)
+                ucs = self._paginate(DBManager.iter_uids_and_co_ids(query), kw_args)
+                if ucs is None:
+                    return
+                # keep only the uids of the results, the rows are streamed again below
+                co_id = None
+                uids = []
+                for uid, co_id in ucs:
+                    uids.append(uid)
             except Exception as e:
                 CacheInterface.error(f"Error while executing query: {str(e)}")
                 return
 
-            if ucs is None or len(ucs) <= 0:
+            if not uids:
                 print("The query result was empty!")
                 return
             
             # get and print the query res
-            co_data = CacheEngine._get_computation_object_data(ucs[0][1])
-            uids = [uc[0] for uc in ucs]
-            rows = DBManager.get_rows_for_obj_uids(uids, co_data)
-            string_rep = DBManager.get_string_rep_for_query_res(rows)
-            print(string_rep)
-
-            # load the objects
-            objs = [CacheEngine.load_object(uc[1], uc[0]) for uc in ucs]
-            
-            # convert to list to single object if there is only one object
-            if len(objs) == 1: objs = objs[0]
+            co_data = CacheEngine._get_computation_object_data(co_id)
+            for line in DBManager.iter_string_rep_for_query_res(DBManager.iter_rows_for_obj_uids(uids, co_data)):
+                print(line)
+
+            # store lazy references; the objects are loaded when they are first used
+            CoVars.add_co_ref_uids(varname, co_data, uids)
 
-            CoVars.add_co_ref(varname, objs)
+            if "load" in flag_args:
+                ref = CoVars.get_co_ref(varname)
+                for n_loaded in CoVars.iter_load_ref(ref, kw_args.get("workers")):
+                    print(f"\rLoaded {n_loaded}/{len(uids)} objects", end="", flush=True)
+                print()
 
             print(f"Stored the result in the variable {varname}!")
             return
@@ -182,7 +239,7 @@ class SetCommand(Command):
                 CacheInterface.error(f"The variable {var} did not exist!")
                 return
             print(f"Made {varname} point to the value in {var}!")
-            CoVars.add_co_ref(var, ref.data)
+            CoVars.add_co_ref(varname, ref.data)
 
 
 class ExecCommand(Command):
@@ -208,10 +265,55 @@ class ExecCommand(Command):
             ARGTYPE_KW,
             "Stores the result as a variable with the given name."
         ))
+        self.register_argument(ArgInfo(
+            "recompute",
+            ARGTYPE_FLAG,
+            "Call the function even if a memoized result exists.",
+            aliases=("r",)
+        ))
+        self.register_argument(ArgInfo(
+            "map",
+            ARGTYPE_FLAG,
+            "Perform the function for every element of the list variables passed with -in, and store the results as a list variable with -set.",
+            aliases=("m",)
+        ))
+        self.register_argument(ArgInfo(
+            "product",
+            ARGTYPE_FLAG,
+            "With -map, perform the function for every combination of the list elements instead of pairing them up.",
+            aliases=("p",)
+        ))
+        self.register_argument(ArgInfo(
+            "workers",
+            ARGTYPE_KW,
+            "With -map, the number of processes to perform the function with.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("w",)
+        ))
+        self.register_argument(ArgInfo(
+            "profile",
+            ARGTYPE_FLAG,
+            "Call the function even if a memoized result exists, and profile loading the inputs, the call and saving the result. Show the profile with prof.",
+        ))
+        self.register_argument(ArgInfo(
+            "memory",
+            ARGTYPE_FLAG,
+            "With -profile, also trace the memory allocations. Slows the call down.",
+            aliases=("mem",)
+        ))
 
     def _execute_logic(self, pos_args, kw_args, flag_args):
         func_name = pos_args[0]
 
+        if "map" in flag_args:
+            self._execute_map(func_name, kw_args, flag_args)
+            return
+
+        profile = None
+        if "profile" in flag_args:
+            profile = ExecProfile(trace_memory="memory" in flag_args)
+        load_phase = lambda: CacheEngine._profile_phase(profile, PHASE_LOAD_INPUTS)
+
         # the list where final computation object arguments will be stored
         input_computation_objects = []
 
@@ -229,20 +331,22 @@ class ExecCommand(Command):
                 
                 if ref.vartype == VARTYPE_LIST:
                     sel_uid = CacheInterface.select_uid_from_query_res(
-                        CacheEngine.get_metadatas_for_computation_objects(ref.data),
+                        CoVars.get_metadata_list_from_ref(ref),
                         f"Select an object from variable {varname} to pass to {func_name}"
                     )
                     if sel_uid is None:
                         CacheInterface.error(f"No selection made for variable {varname}!")
                         return
-                    obj = CoVars.get_obj_from_uid(sel_uid)
+                    with load_phase():
+                        obj = CoVars.get_obj_from_uid(sel_uid)
                     if obj is None:
                         CacheInterface.error(f"Could not find object with uid {sel_uid} from variable {varname}!")
                         return
                     input_computation_objects.append(obj)
 
                 elif ref.vartype == VARTYPE_SINGLE:
-                    input_computation_objects.append(ref.data)
+                    with load_phase():
+                        input_computation_objects.append(ref.data.get())
 
         # check that the correct amount of args have been passed
         # to the computation function.
@@ -256,7 +360,8 @@ class ExecCommand(Command):
                     DBManager.get_all_rows_for_co_id(input_data.object_identifier),
                     f"Select {input_data.object_identifier} to pass as arg {i}:")
                 
-                inp_obj = CacheEngine.load_object(input_data.object_identifier, uid)
+                with load_phase():
+                    inp_obj = CacheEngine.load_object(input_data.object_identifier, uid)
                 input_computation_objects.append(inp_obj)
 
         # find the args
@@ -265,21 +370,80 @@ class ExecCommand(Command):
 
         res_obj = None
         try:
-            res_obj = CacheEngine.perform_computation_function(func_name, input_computation_objects, normal_args)
+            res_obj, uid = CacheEngine.perform_computation_function(
+                func_name,
+                input_computation_objects,
+                normal_args,
+                recompute="recompute" in flag_args,
+                profile=profile or False,
+                return_uid=True,
+            )
         except Exception as e:
             CacheInterface.error(f"Error while performing {func_name}: {e}")
             raise e
     
         if res_obj is None: return
         
-        uid = CacheEngine.save_object(res_obj)
-        print(f"Saved resulting object with uid {uid[0:9]}...")
+        # the result is saved by `perform_computation_function`
+        if uid is None:
+            CacheInterface.error(f"The result of {func_name} could not be saved")
+        else:
+            print(f"Resulting object has uid {uid[0:9]}...")
+
+        if profile is not None and uid is not None:
+            print(profile.get_summary())
+            print(f"Show the full profile with: prof {uid}")
 
         if "set" in kw_args:
             varname = kw_args["set"][0]
             CoVars.add_co_ref(varname, res_obj)
             print(f"Stored the result in {varname}!")
 
+    def _execute_map(self, func_name, kw_args, flag_args):
+        input_datas = CacheEngine.get_computation_function_input_datas(func_name)
+        varnames = kw_args.get("in", [])
+        if len(varnames) != len(input_datas):
+            CacheInterface.error(f"-map needs a variable passed with -in for each of the {len(input_datas)} inputs of {func_name}!")
+            return
+
+        input_uid_lists = []
+        for varname in varnames:
+            ref = CoVars.get_co_ref(varname)
+            if ref is None:
+                CacheInterface.error(f"The variable {varname} does not exist!")
+                return
+            input_uid_lists.append(ref.get_uids())
+
+        try:
+            n_inputs = len(CacheEngine.get_map_inputs(input_uid_lists, "product" in flag_args))
+            result_uids = [None] * n_inputs
+            for n_done, (idx, uid) in enumerate(CacheEngine.iter_map_computation_function(
+                func_name,
+                input_uid_lists,
+                kw_args.get("arg", []),
+                product="product" in flag_args,
+                workers=kw_args.get("workers"),
+                recompute="recompute" in flag_args,
+                ), 1):
+                result_uids[idx] = uid
+                print(f"\rPerformed {func_name} {n_done}/{n_inputs} times", end="", flush=True)
+            print()
+        except Exception as e:
+            CacheInterface.error(f"Error while mapping {func_name}: {e}")
+            return
+
+        output_data = CacheEngine._computation_function_dict[func_name].output
+        if output_data is Void:
+            return
+
+        uids = [uid for uid in result_uids if uid is not None]
+        print(f"Got {len(uids)} results, {n_inputs - len(uids)} calls failed.")
+
+        if "set" in kw_args and uids:
+            varname = kw_args["set"][0]
+            CoVars.add_co_ref_uids(varname, output_data, uids)
+            print(f"Stored the results in {varname}!")
+
 class SqlCommand(Command):
     def initialize(self):
         self.register_argument(ArgInfo(
@@ -287,6 +451,7 @@ class SqlCommand(Command):
             ARGTYPE_POS,
             "SQL query to execute. INSERTing rows is prohibited. Use quotes if needed.",
         ))
+        self._register_page_arguments()
 
     def _execute_logic(self, pos_args, kw_args, flag_args):
         query = pos_args[0].strip()
@@ -296,13 +461,16 @@ class SqlCommand(Command):
             return
 
         try:
-            res = DBManager.query(query)
+            res = self._paginate(DBManager.iter_query(query), kw_args)
+            if res is None:
+                return
+            # print the rows as they are fetched
+            for line in DBManager.iter_string_rep_for_query_res(res):
+                print(line)
         except Exception as e:
             CacheInterface.error(f"SQL error: {e}")
             return
 
-        print(DBManager.get_string_rep_for_query_res(res))
-
 class ListComputationObjectsCommand(Command):
     def initialize(self):
         pass
@@ -475,14 +643,7 @@ class LsVarsCommand(Command):
 
         # helper to print metadata nicely using get_string_rep_for_query_res
         def print_metadata(ref: ComputationObjectReference):
-            # get uids
-            if ref.vartype == VARTYPE_SINGLE:
-                objs = [ref.data]
-            else:
-                objs = ref.data
-
-            uids = [CacheEngine.get_co_hash(o) for o in objs]
-            rows = DBManager.get_rows_for_obj_uids(uids, ref.co_data)
+            rows = CoVars.get_metadata_list_from_ref(ref)
             print(DBManager.get_string_rep_for_query_res(rows))
 
         # if -varname is passed, show metadata
@@ -503,6 +664,330 @@ class LsVarsCommand(Command):
                 print_metadata(ref)
 
 
+class MigrateCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "depth",
+            ARGTYPE_KW,
+            "The number of shard directory levels. 0 stores all objects in one directory.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("d",)
+        ))
+        self.register_argument(ArgInfo(
+            "width",
+            ARGTYPE_KW,
+            "The number of hex characters in each shard directory name.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("wd",)
+        ))
+        self.register_argument(ArgInfo(
+            "workers",
+            ARGTYPE_KW,
+            "The number of threads to move objects with.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("w",)
+        ))
+        self.register_argument(ArgInfo(
+            "metadata",
+            ARGTYPE_FLAG,
+            "Copy the metadata saved before a computation object's metadata changed into its current relation.",
+            aliases=("m",)
+        ))
+        self.register_argument(ArgInfo(
+            "batch",
+            ARGTYPE_KW,
+            "The number of metadata rows to copy per transaction.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("b",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        if "metadata" in flag_args:
+            self._migrate_metadata(kw_args)
+            return
+
+        current = CacheEngine._obj_layout
+        if "depth" not in kw_args and "width" not in kw_args and CacheEngine._prev_obj_layout is None:
+            print(f"Current object layout: {current.to_string()} (depth x width)")
+            self._print_metadata_migrations()
+            return
+
+        try:
+            layout = ObjectLayout(
+                kw_args.get("depth", current.depth),
+                kw_args.get("width", current.width or ObjectLayout().width),
+            )
+        except ValueError as e:
+            CacheInterface.error(f"Invalid layout: {e}")
+            return
+
+        print(f"Migrating objects to the layout {layout.to_string()}...")
+        n_moved = CacheEngine.migrate_obj_layout(layout, kw_args.get("workers"))
+        print(f"Moved {n_moved} objects!")
+
+    @staticmethod
+    def _print_metadata_migrations():
+        migrations = DBManager.get_relation_migrations()
+        if not migrations:
+            return
+
+        print("Pending metadata migrations:")
+        for m in migrations:
+            percent = 100 * m["last_rowid"] / m["max_rowid"]
+            print(f"  {m['co_identifier']:<15} {m['source_relation']} -> {m['target_relation']}: {percent:.1f}% ({m['copied']} rows copied)")
+
+    def _migrate_metadata(self, kw_args):
+        batch_size = kw_args.get("batch", MIGRATION_BATCH_SIZE)
+        if batch_size < 1:
+            CacheInterface.error("The batch size must be positive")
+            return
+
+        n_pending = len(DBManager.get_relation_migrations())
+        if n_pending == 0:
+            print("No metadata to migrate")
+            return
+
+        print(f"Migrating the metadata of {n_pending} relation(s)...")
+        n_copied = 0
+        def on_batch(n):
+            nonlocal n_copied
+            n_copied += n
+            print(f"\r  {n_copied} rows copied", end="", flush=True)
+
+        try:
+            DBManager.migrate_relations(batch_size=batch_size, on_batch=on_batch)
+        except KeyboardInterrupt:
+            print("\nInterrupted; run the command again to resume")
+            return
+        print(f"\nMigrated {n_copied} rows!")
+
+class BackfillCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "identifier",
+            ARGTYPE_POS,
+            "The computation object to compute missing metadata of.",
+        ))
+        self.register_argument(ArgInfo(
+            "workers",
+            ARGTYPE_KW,
+            "The number of processes to compute the metadata with. 1 computes it in this process.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("w",)
+        ))
+        self.register_argument(ArgInfo(
+            "batch",
+            ARGTYPE_KW,
+            "The number of objects to write per transaction.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("b",)
+        ))
+        self.register_argument(ArgInfo(
+            "rate",
+            ARGTYPE_KW,
+            "The maximum number of objects to process per second.",
+            preprocess_func=lambda x: float(x[0]),
+            aliases=("r",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        if not pos_args:
+            CacheInterface.error("Pass the identifier of a computation object")
+            return
+
+        identifier = pos_args[0]
+        if identifier not in CacheEngine._computation_object_dict:
+            CacheInterface.error(f"{identifier} is not a computation object")
+            return
+
+        n_updated = 0
+        n_failed = 0
+        n_copied = 0
+        def on_batch(updated, failed, copied):
+            nonlocal n_updated, n_failed, n_copied
+            n_updated += updated
+            n_failed += failed
+            n_copied += copied
+            print(f"\rCopied {n_copied} rows, updated {n_updated} objects, {n_failed} failed", end="", flush=True)
+
+        try:
+            CacheEngine.backfill_metadata(
+                identifier,
+                workers=kw_args.get("workers"),
+                batch_size=kw_args.get("batch", BACKFILL_BATCH_SIZE),
+                max_rate=kw_args.get("rate"),
+                on_batch=on_batch,
+                )
+        except KeyboardInterrupt:
+            print("\nInterrupted; run the command again to resume")
+            return
+        except Exception as e:
+            CacheInterface.error(f"Error while backfilling the metadata of {identifier}: {e}")
+            return
+
+        print()
+        print(f"Backfilled the metadata of {n_updated} objects" if n_updated or n_failed or n_copied else "No metadata is missing")
+
+class EvictCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "dry",
+            ARGTYPE_FLAG,
+            "Only show what would be evicted.",
+            aliases=("d",)
+        ))
+        self.register_argument(ArgInfo(
+            "max",
+            ARGTYPE_KW,
+            "The quota of the stored payloads in bytes. 0 removes the quota.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("m",)
+        ))
+        self.register_argument(ArgInfo(
+            "policy",
+            ARGTYPE_KW,
+            f"Which objects to evict first: one of {', '.join(EVICTION_POLICIES)}.",
+            preprocess_func=lambda x: x[0],
+            aliases=("p",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        try:
+            CacheEngine.configure_eviction(max_bytes=kw_args.get("max"), policy=kw_args.get("policy"))
+        except ValueError as e:
+            CacheInterface.error(str(e))
+            return
+
+        dry_run = "dry" in flag_args
+        try:
+            result = CacheEngine.evict(dry_run=dry_run)
+        except Exception as e:
+            CacheInterface.error(f"Error while evicting objects: {e}")
+            return
+
+        verb = "Would evict" if dry_run else "Evicted"
+        print(f"{verb} {result['evicted']} objects ({result['freed_bytes']} bytes); the store has {result['store_bytes']} bytes")
+
+class PinCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "varname",
+            ARGTYPE_KW,
+            "Pin the objects of the given variable.",
+            aliases=("v",)
+        ))
+        self.register_argument(ArgInfo(
+            "uid",
+            ARGTYPE_KW,
+            "Pin the objects with the given uids.",
+        ))
+        self.register_argument(ArgInfo(
+            "unpin",
+            ARGTYPE_FLAG,
+            "Unpin the objects instead.",
+            aliases=("u",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        uids = list(kw_args.get("uid", []))
+        for varname in kw_args.get("varname", []):
+            ref = CoVars.get_co_ref(varname)
+            if ref is None:
+                CacheInterface.error(f"Variable '{varname}' does not exist!")
+                return
+            uids.extend(ref.get_uids())
+
+        if not uids:
+            CacheInterface.error("Pass a variable with -v or uids with -uid")
+            return
+
+        pinned = "unpin" not in flag_args
+        CacheEngine.pin_objects(uids, pinned)
+        print(f"{'Pinned' if pinned else 'Unpinned'} {len(uids)} objects")
+
+class ProfCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "uid",
+            ARGTYPE_POS,
+            "The uid of the result of a profiled exec.",
+        ))
+        self.register_argument(ArgInfo(
+            "sort",
+            ARGTYPE_KW,
+            f"The pstats sort key of the listed functions, e.g. tottime or ncalls. Defaults to {PROFILE_SORT_KEY}.",
+            preprocess_func=lambda x: x[0],
+            aliases=("s",)
+        ))
+        self.register_argument(ArgInfo(
+            "lines",
+            ARGTYPE_KW,
+            f"The number of functions to list. Defaults to {PROFILE_LINES}.",
+            preprocess_func=lambda x: int(x[0]),
+            aliases=("n",)
+        ))
+        self.register_argument(ArgInfo(
+            "out",
+            ARGTYPE_KW,
+            "Also write the profile to the given file, e.g. to open it with snakeviz.",
+            preprocess_func=lambda x: x[0],
+            aliases=("o",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        if not pos_args:
+            CacheInterface.error("Pass the uid of a result")
+            return
+
+        uid = pos_args[0]
+        prof = CacheEngine.get_profile(uid)
+        if prof is None:
+            CacheInterface.error(f"There is no profile for {uid}; profile a call with exec -profile")
+            return
+
+        print(f"Profile of {prof['func_name']} at {prof['timestamp']}:")
+        print(prof["summary"])
+        print()
+        try:
+            print(format_stats(prof["stats"], kw_args.get("sort", PROFILE_SORT_KEY), kw_args.get("lines", PROFILE_LINES)))
+        except KeyError as e:
+            CacheInterface.error(f"Invalid sort key: {e}")
+            return
+
+        if "out" in kw_args:
+            with open(kw_args["out"], "wb") as file:
+                file.write(prof["stats"])
+            print(f"Wrote the profile to {kw_args['out']}")
+
+class StatsCommand(Command):
+    def initialize(self):
+        self.register_argument(ArgInfo(
+            "category",
+            ARGTYPE_POS,
+            "Only show the timings of the category: save, save_method, load, load_method, metadata, db or function.",
+        ))
+        self.register_argument(ArgInfo(
+            "reset",
+            ARGTYPE_FLAG,
+            "Reset the timings after showing them.",
+            aliases=("r",)
+        ))
+
+    def _execute_logic(self, pos_args, kw_args, flag_args):
+        stats = CacheEngine.get_timing_stats(pos_args[0] if pos_args else None)
+        if not stats:
+            print("[No timings recorded]")
+        else:
+            print(f"{'category':<12} {'name':<32} {'count':>8} {'total s':>9} {'per s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+            for s in stats:
+                print(
+                    f"{s['category']:<12} {s['name']:<32} {s['count']:>8} {s['total_s']:>9.3f} {s['per_s']:>9.1f} "
+                    f"{s['p50_s'] * 1e3:>9.3f} {s['p95_s'] * 1e3:>9.3f} {s['p99_s'] * 1e3:>9.3f} {s['max_s'] * 1e3:>9.3f}"
+                )
+
+        if "reset" in flag_args:
+            Timings.reset()
+
 class QuitCommand(Command):
     def initialize(self):
         pass
@@ -527,19 +1012,7 @@ class Ansi:
     YELLOW = "\033[33m"
 
 
-# initialize command line history file (ChatGPT generated)
-import os
-histfile = os.path.expanduser("~/.ccache_history")
-try:
-    readline.read_history_file(histfile)
-except FileNotFoundError:
-    pass
-
-import atexit
-atexit.register(readline.write_history_file, histfile)
-
-# customize tab completion
-readline.parse_and_bind("tab: complete")
+HISTORY_FILE = os.path.expanduser("~/.ccache_history")
 
 class CacheInterface:
     CURSOR_SYMBOL = f"{Ansi.BOLD}{Ansi.CYAN}ccache>{Ansi.RESET} "
@@ -547,6 +1020,25 @@ class CacheInterface:
 
     shouldExit = False
 
+    _readline_ready = False
+
+    @staticmethod
+    def _setup_readline():
+        """Loads the command line history and enables tab completion, when the first REPL starts."""
+        if CacheInterface._readline_ready:
+            return
+        CacheInterface._readline_ready = True
+
+        # initialize command line history file (ChatGPT generated)
+        try:
+            readline.read_history_file(HISTORY_FILE)
+        except FileNotFoundError:
+            pass
+        atexit.register(readline.write_history_file, HISTORY_FILE)
+
+        # customize tab completion
+        readline.parse_and_bind("tab: complete")
+
     @staticmethod
     def error(message: str):
         print(message)
@@ -558,6 +1050,7 @@ class CacheInterface:
 
     @staticmethod
     def repl():
+        CacheInterface._setup_readline()
         CacheEngine.start()
         while True:
             inp = input(CacheInterface.CURSOR_SYMBOL).strip()
@@ -725,6 +1218,42 @@ CacheInterface.register_command(CommandInfo(
     "List all variables, optionally show metadata"
 ))
 
+CacheInterface.register_command(CommandInfo(
+    "migrate",
+    MigrateCommand(),
+    "show the object layout and pending metadata migrations, or migrate objects or metadata"
+))
+
+CacheInterface.register_command(CommandInfo(
+    "backfill",
+    BackfillCommand(),
+    "compute the metadata variables that objects saved before they were added are missing"
+))
+
+CacheInterface.register_command(CommandInfo(
+    "evict",
+    EvictCommand(),
+    "evict objects that exceed the store quota or whose TTL expired"
+))
+
+CacheInterface.register_command(CommandInfo(
+    "pin",
+    PinCommand(),
+    "pin objects so that they are never evicted, or unpin them"
+))
+
+CacheInterface.register_command(CommandInfo(
+    "prof",
+    ProfCommand(),
+    "show the profile of a call made with exec -profile"
+))
+
+CacheInterface.register_command(CommandInfo(
+    "stats",
+    StatsCommand(),
+    "show the latency percentiles and throughput of saves, loads, queries and computation functions"
+))
+
 CacheInterface.register_command(CommandInfo(
     "quit",
     QuitCommand(),
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import sys
+import threading
+from typing import Any, Callable
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ObjectCache:
+    """
+    An in-process LRU cache of loaded computation objects, keyed by uid and
+    bounded by the estimated size of the cached objects.
+
+    Objects are sized by the size passed to `put`, which the engine sets to
+    the decoded payload size of the object, as an estimate of its memory use.
+    A `sizer` overrides it for types whose loaded form is much larger or
+    smaller than their payload. Objects put without a size or sizer are sized
+    with `sys.getsizeof`, which does not include the size of attributes.
+
+    The cache is safe to use from several threads.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, sizer: Callable[[Any], int] | None = None):
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be non-negative; was {max_bytes}")
+
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        """uid -> (object, estimated size), from least to most recently used."""
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, uid: str, cls: type | None = None) -> Any | None:
+        """
+        Returns the cached object with the given uid, or None if it is not cached.
+        If `cls` is given, objects of other types are treated as not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None or (cls is not None and type(entry[0]) is not cls):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(uid)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, uid: str, obj: Any, size: int | None = None):
+        """
+        Caches an object of `size` bytes, evicting the least recently used objects
+        until the cache fits in `max_bytes`. Objects larger than `max_bytes` are
+        not cached.
+        """
+        if self.sizer is not None:
+            size = self.sizer(obj)
+        elif size is None:
+            size = sys.getsizeof(obj)
+        with self._lock:
+            self._discard(uid)
+            if size > self.max_bytes:
+                return
+
+            self._entries[uid] = (obj, size)
+            self._n_bytes += size
+            while self._n_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._n_bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, uid: str):
+        """Removes the object with the given uid from the cache if it is cached."""
+        with self._lock:
+            self._discard(uid)
+
+    def _discard(self, uid: str):
+        entry = self._entries.pop(uid, None)
+        if entry is not None:
+            self._n_bytes -= entry[1]
+
+    def __contains__(self, uid: str) -> bool:
+        with self._lock:
+            return uid in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._n_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the counters and current usage of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "objects": len(self._entries),
+                "bytes": self._n_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+import hashlib
+import os
+
+MAX_SHARD_CHARS = 16
+"""The number of hex characters available for shard directory names."""
+
+
+@dataclass(frozen=True)
+class ObjectLayout:
+    """
+    Describes where object payloads are stored in the object directory.
+
+    Payloads are stored in `depth` levels of shard directories, each named by
+    `width` hex characters of a digest of the uid. The shard directories are
+    kept in a directory named by the layout, so that they can not clash with
+    payloads of the flat layout or of other layouts, e.g. `objs/2x2/ab/cd/<uid>`
+    for a depth and width of 2. A depth of 0 stores all payloads directly in
+    the object directory.
+    """
+    depth: int = 2
+    width: int = 2
+
+    def __post_init__(self):
+        if self.depth < 0 or self.width < 0:
+            raise ValueError(f"depth and width must be non-negative; was {self.depth} and {self.width}")
+        if self.depth > 0 and self.width < 1:
+            raise ValueError("width must be at least 1 for a sharded layout")
+        if self.depth * self.width > MAX_SHARD_CHARS:
+            raise ValueError(f"depth * width can be at most {MAX_SHARD_CHARS}; was {self.depth * self.width}")
+
+    def get_path(self, obj_dir: str, uid: str) -> str:
+        if self.depth == 0:
+            return os.path.join(obj_dir, uid)
+
+        # shard by a digest of the uid, since uids from `hash()` are not uniformly distributed
+        digest = hashlib.blake2b(uid.encode("utf-8"), digest_size=MAX_SHARD_CHARS // 2).hexdigest()
+        shards = [digest[i * self.width:(i + 1) * self.width] for i in range(self.depth)]
+        return os.path.join(obj_dir, self.to_string(), *shards, uid)
+
+    def to_string(self) -> str:
+        return f"{self.depth}x{self.width}"
+
+    @staticmethod
+    def from_string(string_rep: str) -> "ObjectLayout":
+        depth, width = string_rep.split("x")
+        return ObjectLayout(int(depth), int(width))
+
+
+FLAT_LAYOUT = ObjectLayout(0, 0)
+"""The layout of stores created before payloads were sharded."""
@@ -0,0 +1,128 @@
+"""Stdlib compression codecs for object payloads.
+
+Payloads are compressed and decompressed as streams of chunks, so memory
+use does not grow with the payload size.
+"""
+import bz2
+import io
+import lzma
+import zlib
+from typing import BinaryIO
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+CODEC_BZ2 = "bz2"
+
+CODECS = (CODEC_NONE, CODEC_ZLIB, CODEC_LZMA, CODEC_BZ2)
+
+COPY_CHUNK_SIZE = 1 << 20
+
+
+class _ZlibWriter(io.RawIOBase):
+    """Compresses the written bytes into a zlib stream in `raw`."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self._compressor = zlib.compressobj()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._raw.write(self._compressor.compress(b))
+        return memoryview(b).nbytes
+
+    def close(self):
+        if not self.closed:
+            self._raw.write(self._compressor.flush())
+        super().close()
+
+
+class _ZlibReader(io.RawIOBase):
+    """Reads the decompressed bytes of a zlib stream in `raw`."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self._decompressor = zlib.decompressobj()
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            if self._decompressor.eof:
+                return 0
+            data = self._decompressor.unconsumed_tail or self._raw.read(COPY_CHUNK_SIZE)
+            if not data:
+                raise EOFError("the zlib stream ended before the end-of-stream marker")
+            # bound the output per call, so that highly compressed data does not expand at once
+            self._buffer = self._decompressor.decompress(data, COPY_CHUNK_SIZE)
+
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class _Unclosable(io.RawIOBase):
+    """Passes reads and writes through to `raw` without closing it."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return self._raw.readable()
+
+    def writable(self) -> bool:
+        return self._raw.writable()
+
+    def readinto(self, b) -> int:
+        return self._raw.readinto(b)
+
+    def write(self, b) -> int:
+        return self._raw.write(b)
+
+
+def check_codec(codec: str):
+    if codec not in CODECS:
+        raise ValueError(f"codec must be one of {CODECS}; was {codec}")
+
+
+def wrap_writer(raw: BinaryIO, codec: str) -> BinaryIO:
+    """
+    Returns a file object that compresses the bytes written to it into `raw`.
+    Closing it flushes the compressor but does not close `raw`.
+    """
+    check_codec(codec)
+    if codec == CODEC_ZLIB:
+        return io.BufferedWriter(_ZlibWriter(raw), COPY_CHUNK_SIZE)
+    if codec == CODEC_LZMA:
+        return lzma.LZMAFile(raw, "wb")
+    if codec == CODEC_BZ2:
+        return bz2.BZ2File(raw, "wb")
+    return _Unclosable(raw)
+
+
+def wrap_reader(raw: BinaryIO, codec: str) -> BinaryIO:
+    """
+    Returns a file object that reads the decompressed bytes of `raw`.
+    Closing it does not close `raw`.
+    """
+    check_codec(codec)
+    if codec == CODEC_ZLIB:
+        return io.BufferedReader(_ZlibReader(raw), COPY_CHUNK_SIZE)
+    if codec == CODEC_LZMA:
+        return lzma.LZMAFile(raw, "rb")
+    if codec == CODEC_BZ2:
+        return bz2.BZ2File(raw, "rb")
+    return _Unclosable(raw)
+
+
+def copy_stream(src: BinaryIO, dst: BinaryIO, digest = None):
+    """Copies `src` to `dst` in chunks, updating `digest` with the copied bytes if given."""
+    while chunk := src.read(COPY_CHUNK_SIZE):
+        dst.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
@@ -0,0 +1,129 @@
+"""Profiles of single computation function calls.
+
+An `ExecProfile` runs cProfile, and optionally tracemalloc, over the phases
+of a call: loading the inputs, calling the function and saving the result.
+The profile is stored with the uid of the result, so that it can be looked
+at later with `CacheEngine.get_profile` or the `prof` command.
+"""
+import cProfile
+from contextlib import contextmanager
+import io
+import marshal
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+from typing import Iterator
+
+PHASE_LOAD_INPUTS = "load inputs"
+PHASE_FUNCTION = "function"
+PHASE_SAVE = "save"
+
+PROFILE_SORT_KEY = "cumulative"
+PROFILE_LINES = 30
+"""The number of functions `format_stats` lists by default."""
+TOP_ALLOCATIONS = 10
+"""The number of allocation sites listed in the memory summary."""
+
+
+class ExecProfile:
+    """
+    Collects a cProfile of the phases of a computation function call, and the
+    wall time of each phase. With `trace_memory`, tracemalloc also records the
+    peak memory of each phase and the sites that allocated the most memory.
+
+    Phases can be added by the caller, e.g. to include loading the inputs:
+
+        profile = ExecProfile(trace_memory=True)
+        with profile.phase(PHASE_LOAD_INPUTS):
+            a = CacheEngine.load_object(MyNumber, uid)
+        CacheEngine.perform_computation_function("f", [a], [], profile=profile)
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases: dict[str, list] = {}
+        """name -> [seconds, peak bytes, allocated bytes] of each phase, in order. A phase
+        profiled several times, e.g. to load each input, sums the seconds and allocations."""
+        self._profiler = cProfile.Profile()
+        self._started_tracing = False
+        self._first_snapshot: tracemalloc.Snapshot | None = None
+        self._top_allocations: list[str] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Profiles the block as (part of) the phase `name`."""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if self._first_snapshot is None:
+                self._first_snapshot = _take_snapshot()
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            seconds = time.perf_counter() - start
+            totals = self.phases.setdefault(name, [0.0, None, None])
+            totals[0] += seconds
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                totals[1] = max(totals[1] or 0, peak - start_bytes)
+                totals[2] = (totals[2] or 0) + current - start_bytes
+
+    def finish(self):
+        """Stops tracing memory if this profile started it. Call it after the last phase."""
+        if self._first_snapshot is not None:
+            stats = _take_snapshot().compare_to(self._first_snapshot, "lineno")
+            self._top_allocations = [str(stat) for stat in stats[:TOP_ALLOCATIONS] if stat.size_diff > 0]
+            self._first_snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def get_summary(self) -> str:
+        """Returns the wall time and memory of the phases, and the top allocation sites."""
+        lines = [f"{'phase':<16} {'seconds':>10} {'peak MiB':>10} {'alloc MiB':>10}"]
+        for name, (seconds, peak, allocated) in self.phases.items():
+            memory = f"{peak / 2**20:>10.2f} {allocated / 2**20:>10.2f}" if peak is not None else f"{'-':>10} {'-':>10}"
+            lines.append(f"{name:<16} {seconds:>10.4f} {memory}")
+        lines.append(f"{'total':<16} {sum(p[0] for p in self.phases.values()):>10.4f}")
+
+        if self._top_allocations:
+            lines.append("")
+            lines.append("Top allocations still held after the call:")
+            lines.extend(f"  {line}" for line in self._top_allocations)
+        return "\n".join(lines)
+
+    def get_stats_bytes(self) -> bytes:
+        """Returns the profile in the format of `pstats` files, e.g. for snakeviz."""
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats)
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    # leave out the allocations of the profiler itself
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ))
+
+
+def format_stats(stats_bytes: bytes, sort_key: str = PROFILE_SORT_KEY, n_lines: int = PROFILE_LINES) -> str:
+    """Returns the `n_lines` functions of a stored profile that rank highest by `sort_key`, as listed by `pstats`."""
+    # pstats only reads profiles from files
+    fd, path = tempfile.mkstemp(suffix=".prof")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(stats_bytes)
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats(sort_key).print_stats(n_lines)
+    finally:
+        os.remove(path)
+    return stream.getvalue()